@@ -0,0 +1,52 @@
+"""Compare cloning a document snapshot with loading the document.
+
+Usage: python benchmarks/clone.py [number of documents]
+"""
+
+import os.path
+import sys
+import time
+
+from docx import Document
+
+from docxcompose.snapshot import DocumentSnapshot
+
+
+DOCS = os.path.join(os.path.dirname(__file__), "..", "tests", "docs")
+FILENAMES = [
+    "master.docx",
+    "header_with_image.docx",
+    "numberings.docx",
+    "embedded_excel_chart.docx",
+]
+
+
+def docx_path(filename):
+    return os.path.join(DOCS, filename)
+
+
+def load_documents(filename, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        Document(docx_path(filename))
+    return time.perf_counter() - start
+
+
+def clone_documents(filename, count):
+    snapshot = DocumentSnapshot(Document(docx_path(filename)))
+    start = time.perf_counter()
+    for _ in range(count):
+        snapshot.clone()
+    return time.perf_counter() - start
+
+
+def main(count=200):
+    print("document                     load ms   clone ms   speedup")
+    for filename in FILENAMES:
+        load = load_documents(filename, count) / count * 1000
+        clone = clone_documents(filename, count) / count * 1000
+        print("%-26s %9.2f %10.2f %9.1f" % (filename, load, clone, load / clone))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
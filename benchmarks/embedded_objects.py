@@ -0,0 +1,40 @@
+"""Measure how appending documents with embedded objects scales.
+
+Usage: python benchmarks/embedded_objects.py [max number of documents]
+"""
+
+import os.path
+import sys
+import time
+
+from docx import Document
+
+from docxcompose.composer import Composer
+
+
+DOCS = os.path.join(os.path.dirname(__file__), "..", "tests", "docs")
+
+
+def docx_path(filename):
+    return os.path.join(DOCS, filename)
+
+
+def append_documents(count):
+    composer = Composer(Document(docx_path("master.docx")))
+    start = time.perf_counter()
+    for _ in range(count):
+        composer.append(Document(docx_path("embedded_excel_chart.docx")))
+    return time.perf_counter() - start
+
+
+def main(max_count=500):
+    count = max_count // 8 or 1
+    print("documents   seconds   ms/document")
+    while count <= max_count:
+        duration = append_documents(count)
+        print("%9d %9.2f %13.2f" % (count, duration, duration / count * 1000))
+        count *= 2
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
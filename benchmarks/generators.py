@@ -0,0 +1,193 @@
+"""Generate synthetic documents for benchmarks.
+
+The documents are built with python-docx and contain a tunable number of the
+features handled by the composer.
+"""
+
+import random
+import struct
+import zlib
+from io import BytesIO
+
+from docx import Document
+from docx.enum.style import WD_STYLE_TYPE
+from docx.opc.constants import CONTENT_TYPE as CT
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.opc.packuri import PackURI
+from docx.opc.part import Part
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+from docx.shared import Pt
+
+from docxcompose.properties import CustomProperties
+
+
+FOOTNOTES = (
+    "<w:footnotes %s>"
+    '<w:footnote w:type="separator" w:id="-1"><w:p><w:r><w:separator/></w:r>'
+    "</w:p></w:footnote>"
+    '<w:footnote w:type="continuationSeparator" w:id="0"><w:p><w:r>'
+    "<w:continuationSeparator/></w:r></w:p></w:footnote>"
+    "%s"
+    "</w:footnotes>"
+)
+
+FOOTNOTE = (
+    '<w:footnote w:id="%d"><w:p><w:r><w:t>Footnote %d</w:t></w:r></w:p></w:footnote>'
+)
+
+
+def generate_document(
+    paragraphs=0,
+    tables=0,
+    images=0,
+    lists=0,
+    footnotes=0,
+    styles=0,
+    bookmarks=0,
+    docproperties=0,
+    image_size=32,
+    seed=0,
+):
+    """Return a document with the given number of features as bytes.
+
+    Images are noise of `image_size` x `image_size` pixels and differ between
+    documents generated with different seeds.
+    """
+    rnd = random.Random(seed)
+    doc = Document()
+
+    for i in range(paragraphs):
+        doc.add_paragraph("Paragraph %d " % i + "lorem ipsum dolor sit amet " * 4)
+
+    for i in range(tables):
+        table = doc.add_table(rows=3, cols=3)
+        table.style = "Table Grid"
+        for row_index, row in enumerate(table.rows):
+            for col_index, cell in enumerate(row.cells):
+                cell.text = "Table %d %d/%d" % (i, row_index, col_index)
+
+    for _ in range(images):
+        doc.add_picture(BytesIO(png(image_size, image_size, rnd)))
+
+    add_lists(doc, lists)
+    add_footnotes(doc, footnotes)
+
+    for i in range(styles):
+        style = doc.styles.add_style("Synthetic %d" % i, WD_STYLE_TYPE.PARAGRAPH)
+        style.base_style = doc.styles["Normal"]
+        style.font.size = Pt(8 + i % 10)
+        doc.add_paragraph("Styled paragraph %d" % i, style=style)
+
+    for i in range(bookmarks):
+        paragraph = doc.add_paragraph()
+        paragraph._p.append(
+            parse_xml(
+                '<w:bookmarkStart %s w:id="%d" w:name="bookmark_%d"/>'
+                % (nsdecls("w"), i, i)
+            )
+        )
+        paragraph.add_run("Bookmark %d" % i)
+        paragraph._p.append(
+            parse_xml('<w:bookmarkEnd %s w:id="%d"/>' % (nsdecls("w"), i))
+        )
+
+    add_docproperties(doc, docproperties)
+
+    stream = BytesIO()
+    doc.save(stream)
+    return stream.getvalue()
+
+
+def add_lists(doc, count):
+    """Add numbered lists with three items each, every list using its own
+    numbering instance.
+    """
+    if not count:
+        return
+    numbering = doc.part.numbering_part.element
+    abstract_num_id = numbering.num_having_numId(
+        doc.styles["List Number"].element.pPr.numPr.numId.val
+    ).abstractNumId.val
+    for i in range(count):
+        num = numbering.add_num(abstract_num_id)
+        for item in range(3):
+            paragraph = doc.add_paragraph("List %d item %d" % (i, item))
+            paragraph.style = "List Number"
+            paragraph._p.get_or_add_pPr().get_or_add_numPr().get_or_add_numId().val = (
+                num.numId
+            )
+
+
+def add_footnotes(doc, count):
+    if not count:
+        return
+    part = Part(
+        PackURI("/word/footnotes.xml"),
+        CT.WML_FOOTNOTES,
+        (
+            FOOTNOTES
+            % (nsdecls("w"), "".join(FOOTNOTE % (i, i) for i in range(1, count + 1)))
+        ).encode("utf-8"),
+        doc.part.package,
+    )
+    doc.part.relate_to(part, RT.FOOTNOTES)
+    for i in range(1, count + 1):
+        paragraph = doc.add_paragraph("Paragraph with footnote %d" % i)
+        paragraph._p.append(
+            parse_xml(
+                '<w:r %s><w:footnoteReference w:id="%d"/></w:r>' % (nsdecls("w"), i)
+            )
+        )
+
+
+def add_docproperties(doc, count):
+    """Add custom properties, each referenced by a simple and a complex
+    DOCPROPERTY field.
+    """
+    if not count:
+        return
+    cprops = CustomProperties(doc)
+    for i in range(count):
+        name = "Property %d" % i
+        value = "Value %d" % i
+        cprops.add(name, value)
+        instr = ' DOCPROPERTY "%s" \\* MERGEFORMAT ' % name
+        paragraph = doc.add_paragraph()
+        paragraph._p.append(
+            parse_xml(
+                '<w:fldSimple %s w:instr="%s"><w:r><w:t>%s</w:t></w:r></w:fldSimple>'
+                % (nsdecls("w"), instr.replace('"', "&quot;"), value)
+            )
+        )
+        paragraph = doc.add_paragraph()
+        for run in (
+            '<w:fldChar w:fldCharType="begin"/>',
+            '<w:instrText xml:space="preserve">%s</w:instrText>' % instr,
+            '<w:fldChar w:fldCharType="separate"/>',
+            "<w:t>%s</w:t>" % value,
+            '<w:fldChar w:fldCharType="end"/>',
+        ):
+            paragraph._p.append(parse_xml("<w:r %s>%s</w:r>" % (nsdecls("w"), run)))
+
+
+def png(width, height, rnd):
+    """Return a PNG image of random noise."""
+    rows = b"".join(b"\x00" + rnd.randbytes(width * 3) for _ in range(height))
+    return b"".join(
+        [
+            b"\x89PNG\r\n\x1a\n",
+            _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)),
+            _png_chunk(b"IDAT", zlib.compress(rows)),
+            _png_chunk(b"IEND", b""),
+        ]
+    )
+
+
+def _png_chunk(tag, data):
+    return (
+        struct.pack(">I", len(data))
+        + tag
+        + data
+        + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+    )
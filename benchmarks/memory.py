@@ -0,0 +1,135 @@
+"""Measure the peak memory of loading, inserting and saving documents.
+
+For documents of growing size and image payload, the peak of the memory
+allocated by python (tracemalloc) and the peak increase of the resident set
+size (RSS, including memory allocated by lxml) are measured for loading a
+document, appending it a number of times and saving the composed document.
+Every case runs in a fresh process. The last column is the retained memory
+estimated by the composer, see RetainedMemory.
+
+Usage: python benchmarks/memory.py [number of appended documents]
+"""
+
+import gc
+import multiprocessing
+import sys
+import threading
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from docx import Document
+from generators import generate_document
+
+from docxcompose.composer import Composer
+from docxcompose.memory import RetainedMemory
+from docxcompose.prefork import memory_usage
+
+
+CASES = [
+    ("paragraphs", {"paragraphs": 500}),
+    ("paragraphs", {"paragraphs": 2000}),
+    ("paragraphs", {"paragraphs": 8000}),
+    ("images", {"images": 5, "image_size": 64}),
+    ("images", {"images": 5, "image_size": 256}),
+    ("images", {"images": 5, "image_size": 512}),
+]
+
+MB = 1024 * 1024
+
+# Interval in seconds in which the RSS is sampled
+SAMPLE_INTERVAL = 0.002
+
+
+class PeakSampler(threading.Thread):
+    """Samples the RSS of the process in a background thread."""
+
+    def __init__(self):
+        super(PeakSampler, self).__init__(daemon=True)
+        self.start_rss = self.peak = memory_usage()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(SAMPLE_INTERVAL):
+            self.peak = max(self.peak, memory_usage())
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+        self.peak = max(self.peak, memory_usage())
+        return self.peak - self.start_rss
+
+
+def measure(func):
+    """Call func and return its result with the peaks of traced and resident
+    memory in bytes.
+    """
+    gc.collect()
+    sampler = PeakSampler()
+    sampler.start()
+    tracemalloc.start()
+    try:
+        result = func()
+        traced = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+        rss = sampler.stop()
+    return result, traced, rss
+
+
+def run_case(features, count):
+    # Different images in every document, which are not deduplicated
+    sources = [generate_document(seed=seed, **features) for seed in range(count)]
+    composer = Composer(Document(BytesIO(generate_document())), memory=RetainedMemory())
+
+    doc, load_traced, load_rss = measure(lambda: Document(BytesIO(sources[0])))
+    docs = [doc] + [Document(BytesIO(source)) for source in sources[1:]]
+    del doc
+
+    def insert():
+        # Drop the documents once appended, like a caller appending in a loop
+        while docs:
+            composer.append(docs.pop(0))
+
+    _, insert_traced, insert_rss = measure(insert)
+    _, save_traced, save_rss = measure(lambda: composer.save(BytesIO()))
+    return (
+        len(sources[0]),
+        load_traced,
+        load_rss,
+        insert_traced,
+        insert_rss,
+        save_traced,
+        save_rss,
+        composer.memory.total,
+    )
+
+
+def main(count=10):
+    print(
+        "%-11s %-24s %8s %15s %15s %15s %9s"
+        % ("case", "features", "size", "load", "insert", "save", "retained")
+    )
+    print(
+        "%-11s %-24s %8s %15s %15s %15s %9s"
+        % ("", "", "MB", *["traced/rss MB"] * 3, "MB")
+    )
+    context = multiprocessing.get_context("spawn")
+    for name, features in CASES:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            result = executor.submit(run_case, features, count).result()
+        size, *peaks, retained = result
+        print(
+            "%-11s %-24s %8.2f %7.1f/%-7.1f %7.1f/%-7.1f %7.1f/%-7.1f %9.1f"
+            % (
+                name,
+                ",".join("%s=%s" % item for item in features.items()),
+                size / MB,
+                *[peak / MB for peak in peaks],
+                retained / MB,
+            )
+        )
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,203 @@
+"""Measure how appending and saving synthetic documents scales.
+
+For every scenario, a growing number of generated documents is appended to an
+empty master document. The time of `Composer.append` (without loading the
+documents) and of `Composer.save` is measured, and scenarios whose time grows
+faster than the number of documents are flagged as super-linear.
+
+Usage: python benchmarks/suite.py [--counts 10 20 40 80] [--scenario images]
+                                  [--save results.json]
+                                  [--compare baseline.json]
+"""
+
+import argparse
+import json
+import math
+import sys
+import time
+from io import BytesIO
+
+from docx import Document
+from generators import generate_document
+
+from docxcompose.composer import Composer
+
+
+SCENARIOS = {
+    "paragraphs": {"paragraphs": 200},
+    "tables": {"tables": 20},
+    "images": {"images": 5},
+    "lists": {"lists": 10},
+    "footnotes": {"footnotes": 20},
+    "styles": {"styles": 20},
+    "bookmarks": {"bookmarks": 50},
+    "docproperties": {"docproperties": 10},
+    "mixed": {
+        "paragraphs": 20,
+        "tables": 2,
+        "images": 1,
+        "lists": 2,
+        "footnotes": 2,
+        "styles": 2,
+        "bookmarks": 5,
+        "docproperties": 2,
+    },
+}
+
+COUNTS = [10, 20, 40, 80]
+
+# Exponent of the growth of the time with the number of documents above which
+# a scenario is flagged as super-linear.
+MAX_EXPONENT = 1.3
+
+# Relative slowdown compared to a baseline above which a result is flagged
+# as regression. Shorter times than MIN_SECONDS are too noisy to compare.
+MAX_SLOWDOWN = 0.2
+MIN_SECONDS = 0.05
+
+
+def run_scenario(features, count):
+    master = generate_document()
+    sources = [generate_document(seed=seed, **features) for seed in range(count)]
+
+    composer = Composer(Document(BytesIO(master)))
+    load = append = 0.0
+    for source in sources:
+        start = time.perf_counter()
+        doc = Document(BytesIO(source))
+        load += time.perf_counter() - start
+
+        start = time.perf_counter()
+        composer.append(doc)
+        append += time.perf_counter() - start
+
+    start = time.perf_counter()
+    composer.save(BytesIO())
+    save = time.perf_counter() - start
+
+    return {
+        "load": load,
+        "append": append,
+        "save": save,
+        "documents_per_second": count / (append + save),
+    }
+
+
+def exponent(results, measure):
+    """Estimate k of time ~ count ** k by a least squares fit of the runs on a
+    log-log scale.
+    """
+    points = [
+        (math.log(int(count)), math.log(result[measure]))
+        for count, result in results.items()
+        if result[measure] > 0
+    ]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    if not variance:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / variance
+
+
+def run(scenarios, counts):
+    results = {}
+    print(
+        "%-14s %9s %9s %9s %9s %10s"
+        % ("scenario", "documents", "load", "append", "save", "docs/s")
+    )
+    for name in scenarios:
+        results[name] = {}
+        for count in counts:
+            result = run_scenario(SCENARIOS[name], count)
+            results[name][str(count)] = result
+            print(
+                "%-14s %9d %9.3f %9.3f %9.3f %10.1f"
+                % (
+                    name,
+                    count,
+                    result["load"],
+                    result["append"],
+                    result["save"],
+                    result["documents_per_second"],
+                )
+            )
+    return results
+
+
+def report_scaling(results):
+    flagged = False
+    print("\n%-14s %9s %9s" % ("scenario", "append", "save"))
+    for name, scenario in results.items():
+        exponents = [exponent(scenario, measure) for measure in ("append", "save")]
+        marks = []
+        for value in exponents:
+            if value is not None and value > MAX_EXPONENT:
+                flagged = True
+                marks.append("%8.2f!" % value)
+            elif value is None:
+                marks.append("%9s" % "-")
+            else:
+                marks.append("%9.2f" % value)
+        print("%-14s %s %s" % (name, marks[0], marks[1]))
+    if flagged:
+        print("! super-linear scaling (exponent > %.1f)" % MAX_EXPONENT)
+    return flagged
+
+
+def compare(results, baseline):
+    regressions = []
+    for name, scenario in results.items():
+        for count, result in scenario.items():
+            expected = baseline.get(name, {}).get(count)
+            if expected is None:
+                continue
+            for measure in ("append", "save"):
+                if expected[measure] < MIN_SECONDS:
+                    continue
+                if result[measure] > expected[measure] * (1 + MAX_SLOWDOWN):
+                    regressions.append(
+                        (name, count, measure, expected[measure], result[measure])
+                    )
+    if regressions:
+        print("\nregressions compared to baseline:")
+        for name, count, measure, expected, actual in regressions:
+            print(
+                "%-14s %9s %-7s %9.3f -> %9.3f"
+                % (name, count, measure, expected, actual)
+            )
+    else:
+        print("\nno regressions compared to baseline")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--counts", type=int, nargs="+", default=COUNTS)
+    parser.add_argument(
+        "--scenario",
+        dest="scenarios",
+        action="append",
+        choices=sorted(SCENARIOS),
+        help="Run only the given scenario, can be given multiple times.",
+    )
+    parser.add_argument("--save", help="Save the results as JSON to this file.")
+    parser.add_argument("--compare", help="Compare against the given JSON results.")
+    args = parser.parse_args(argv)
+
+    results = run(args.scenarios or list(SCENARIOS), sorted(args.counts))
+    failed = report_scaling(results)
+
+    if args.compare:
+        with open(args.compare) as baseline:
+            failed = bool(compare(results, json.load(baseline))) or failed
+    if args.save:
+        with open(args.save, "w") as output:
+            json.dump(results, output, indent=2, sort_keys=True)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
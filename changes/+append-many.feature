@@ -0,0 +1 @@
+Add ``Composer.append_many`` to load and prepare documents in a thread pool while appending them.
@@ -0,0 +1 @@
+Add optional recording of the time spent in the stages of composing.
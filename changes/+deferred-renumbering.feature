@@ -0,0 +1 @@
+Optionally defer renumbering of bookmarks and drawing ids until the composed document is saved (``Composer(deferred_renumbering=True)``). The console script and the web service use it.
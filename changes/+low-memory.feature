@@ -0,0 +1 @@
+Add a low memory mode to the composer which releases appended documents given as path or file-like object right away.
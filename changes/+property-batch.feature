@@ -0,0 +1 @@
+Add CustomProperties.batch() to serialize custom properties only once after many changes, and fix set_properties.
@@ -0,0 +1 @@
+Add an estimate of the memory retained by a composer after each insert and a peak memory benchmark.
@@ -0,0 +1 @@
+Keep uploaded and composed documents in memory in the web service unless they exceed a configurable size.
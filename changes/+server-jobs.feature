@@ -0,0 +1 @@
+Add an asynchronous job API to the web service.
@@ -0,0 +1 @@
+Compose documents in a configurable thread or process pool in the web service and reject requests with 503 if too many are queued.
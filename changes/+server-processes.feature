@@ -0,0 +1 @@
+Add a multi-process mode to the web service with recycling of worker processes.
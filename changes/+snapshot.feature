@@ -0,0 +1 @@
+Add ``DocumentSnapshot`` to clone a parsed document faster than loading it again and use it for cached templates in the web service.
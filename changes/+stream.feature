@@ -0,0 +1 @@
+Add ``Composer.stream`` to write the composed document as chunks of bytes and stream the composed document in the web service.
@@ -0,0 +1 @@
+Add a master template cache to the web service.
@@ -5,6 +5,7 @@ from argparse import ArgumentParser
 from docx import Document
 
 from docxcompose.composer import Composer
+from docxcompose.stats import ComposerStats
 
 
 def setup_parser():
@@ -32,6 +33,12 @@ def setup_parser():
         action="store_true",
         default=False,
     )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        default=False,
+        help="print the time spent in the stages of composing",
+    )
     return parser
 
 
@@ -53,12 +60,17 @@ def parse_args(parser, args):
 def compose_files(parser, parsed_args):
     options = {
         "preserve_styles": parsed_args.preserve_styles,
+        "deferred_renumbering": True,
     }
+    if parsed_args.stats:
+        options["stats"] = ComposerStats()
     composer = Composer(Document(parsed_args.master), **options)
     for slave_path in parsed_args.files:
         composer.append(Document(slave_path))
 
     composer.save(parsed_args.ouput_document)
+    if composer.stats is not None:
+        print(composer.stats.report(), file=sys.stderr)
     parser.exit(
         message="successfully composed file at {}\n".format(parsed_args.ouput_document)
     )
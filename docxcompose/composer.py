@@ -1,28 +1,39 @@
 import os.path
 import random
 import re
+from collections import deque
 from collections import OrderedDict
+from concurrent.futures import Future
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
 
+from docx.document import Document as DocxDocument
 from docx.enum.style import WD_STYLE_TYPE
 from docx.opc.constants import CONTENT_TYPE as CT
 from docx.opc.constants import RELATIONSHIP_TYPE as RT
-from docx.opc.oxml import serialize_part_xml
 from docx.opc.packuri import PackURI
 from docx.opc.part import Part
+from docx.opc.part import XmlPart
 from docx.oxml import parse_xml
-from docx.oxml.section import CT_SectPr
+from docx.parts.image import ImagePart
 from docx.parts.numbering import NumberingPart
 
 from docxcompose.image import ImageWrapper
-from docxcompose.properties import CustomProperties
+from docxcompose.numbering import NumberingIndex
+from docxcompose.partnames import FILENAME_IDX_RE  # noqa: F401
+from docxcompose.partnames import PartnameRegistry
+from docxcompose.prepared import PreparedDocument
+from docxcompose.references import ReferenceIndex
+from docxcompose.stats import stage
+from docxcompose.streaming import CHUNK_SIZE
+from docxcompose.streaming import iter_package
+from docxcompose.styles import StyleRegistry
 from docxcompose.utils import increment_name
 from docxcompose.utils import NS
 from docxcompose.utils import xml_elements_equal
 from docxcompose.utils import xpath
 
 
-FILENAME_IDX_RE = re.compile("([a-zA-Z/_-]+)([1-9][0-9]*)?")
 RID_IDX_RE = re.compile("rId([0-9]*)")
 
 REFERENCED_PARTS_IGNORED_RELTYPES = set(
@@ -37,6 +48,12 @@ PART_RELTYPES_WITH_STYLES = [
     RT.FOOTNOTES,
 ]
 
+BOOKMARK_START_TAG = "{%s}bookmarkStart" % NS["w"]
+BOOKMARK_END_TAG = "{%s}bookmarkEnd" % NS["w"]
+DOC_PR_TAG = "{%s}docPr" % NS["wp"]
+C_NV_PR_TAG = "{%s}cNvPr" % NS["pic"]
+FOOTNOTE_TAG = "{%s}footnote" % NS["w"]
+
 IGNORED_STYLE_TAGS = set(
     [
         "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}name",
@@ -46,13 +63,40 @@ IGNORED_STYLE_TAGS = set(
 
 
 class Composer(object):
-    def __init__(self, doc, preserve_styles=False):
+    def __init__(
+        self,
+        doc,
+        preserve_styles=False,
+        deferred_renumbering=False,
+        stats=None,
+        memory=None,
+        low_memory=False,
+    ):
         self.doc = doc
         self.pkg = doc.part.package
 
         self.restart_numbering = True
         self.preserve_styles = preserve_styles
+        # Renumber ids only once when saving or finalizing instead of after
+        # every insert. Use this when appending many documents.
+        self.deferred_renumbering = deferred_renumbering
+        self._renumbering_pending = False
+        # Time spent in the stages of composing, see ComposerStats
+        self.stats = stats
+        # Estimated retained memory updated after every insert, see
+        # RetainedMemory
+        self.memory = memory
+        # Release documents given as path or file-like object right after
+        # inserting them, see PreparedDocument.release
+        self.low_memory = low_memory
         self._preserved_styles = {}
+        self._partnames = None
+        self._image_parts_by_sha1 = None
+        self._image_parts_count = 0
+        self._numbering_part = None
+        self._footnote_part = None
+        self._numbering = None
+        self._styles = None
 
         self.reset_reference_mapping()
 
@@ -62,53 +106,112 @@ class Composer(object):
         self.num_id_mapping = {}
         self.anum_id_mapping = {}
         self._numbering_restarted = set()
+        # Copied parts and relationships of the inserted document
+        self._part_mapping = {}
+        self._rid_mapping = {}
+        self._image_sha1s = {}
+        self._src_numbering = None
+        self._src_styles = None
+        self._src_footnotes = {}
+        self._src_elements = {}
 
     def append(self, doc, remove_property_fields=True):
         """Append the given document."""
         index = self.append_index()
         self.insert(index, doc, remove_property_fields=remove_property_fields)
 
+    def append_many(self, docs, workers=1, remove_property_fields=True):
+        """Append the given documents in the given order.
+
+        The documents can be given as documents, paths or file-like objects.
+        With more than one worker, paths and file-like objects are loaded and
+        prepared in a thread pool while the prepared documents are appended.
+        Documents are prepared when they are appended, as preparing changes
+        them and the same document can be given several times. The result is
+        the same as appending the documents one after another.
+        """
+        if workers <= 1:
+            for doc in docs:
+                self.append(doc, remove_property_fields=remove_property_fields)
+            return
+
+        def append_next():
+            doc = pending.popleft()
+            if isinstance(doc, Future):
+                doc = doc.result()
+            self.append(doc, remove_property_fields=remove_property_fields)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Only prepare a limited number of documents in advance to keep
+            # memory usage bounded.
+            pending = deque()
+            try:
+                for doc in docs:
+                    if not isinstance(doc, DocxDocument):
+                        doc = executor.submit(self.prepare, doc, remove_property_fields)
+                    pending.append(doc)
+                    if len(pending) > workers:
+                        append_next()
+                while pending:
+                    append_next()
+            except BaseException:
+                executor.shutdown(cancel_futures=True)
+                raise
+
+    @stage
+    def prepare(self, doc, remove_property_fields=True):
+        """Load and pre-process the given document for being inserted.
+
+        Preparing documents can run concurrently to inserting other documents.
+        """
+        # The body can only be copied in advance if the formatting of default
+        # styles doesn't have to be retained, see
+        # retain_formatting_from_default_styles.
+        return PreparedDocument(
+            doc,
+            remove_property_fields=remove_property_fields,
+            copy_body=not self.preserve_styles,
+        )
+
+    @stage
     def insert(self, index, doc, remove_property_fields=True):
-        """Insert the given document at the given index."""
+        """Insert the given document at the given index.
+
+        The document can also be a prepared document, in which case
+        `remove_property_fields` has no effect.
+        """
+        if not isinstance(doc, PreparedDocument):
+            doc = self.prepare(doc, remove_property_fields=remove_property_fields)
+        prepared = doc
+        doc = prepared.doc
+
         self.reset_reference_mapping()
+        self._src_styles = prepared.styles
         self._current_preserved_styles = {}
 
-        # Remove custom property fields but keep the values
-        if remove_property_fields:
-            cprops = CustomProperties(doc)
-            for name in cprops.keys():
-                cprops.dissolve_fields(name)
-
         self._create_style_id_mapping(doc)
         self.retain_formatting_from_default_styles(doc)
 
-        for element in doc.element.body:
-            if isinstance(element, CT_SectPr):
-                """This will lead to unexpected behaviors, for example if one
-                of the added documents with landscape set for the last section
-                the page orientation will get lost here. Still this is mostly
-                ok, and otherwise we would need to create a section for each
-                document added, i.e. move the properties into the last
-                paragraph and also decide which properties we allow to overwrite
-                and which should inherit from the main template."""
-                continue
-            element = deepcopy(element)
+        inserted = []
+        for element, refs in prepared.body_elements():
             self.doc.element.body.insert(index, element)
-            self.add_referenced_parts(doc.part, self.doc.part, element)
-            self.add_styles(doc, element)
-            self.add_numberings(doc, element)
-            self.restart_first_numbering(doc, element)
-            self.add_images(doc, element)
-            self.add_diagrams(doc, element)
-            self.add_shapes(doc, element)
-            self.add_footnotes(doc, element)
-            self.remove_header_and_footer_references(doc, element)
+            inserted.append(element)
+            self.add_referenced_parts(doc.part, self.doc.part, element, refs)
+            self.add_styles(doc, element, refs)
+            self.add_numberings(doc, element, refs)
+            self.restart_first_numbering(doc, element, refs)
+            self.add_images(doc, element, refs)
+            self.add_diagrams(doc, element, refs)
+            self.add_shapes(doc, element, refs)
+            self.add_footnotes(doc, element, refs)
+            self.remove_header_and_footer_references(doc, element, refs)
             index += 1
 
         self.add_styles_from_other_parts(doc)
-        self.renumber_bookmarks()
-        self.renumber_docpr_ids()
-        self.renumber_nvpicpr_ids()
+        if self.deferred_renumbering:
+            self._renumbering_pending = True
+        else:
+            self.renumber_ids()
         # The two methods below attempt to fix a general issue we have with
         # sections and their properties which is not correctly solved yet.
         # Right now the situation is really messy. When there is only one
@@ -125,24 +228,86 @@ class Composer(object):
         self.fix_section_types(doc)
         self.fix_header_and_footers(doc)
 
+        if self.low_memory:
+            self.reset_reference_mapping()
+            self._current_preserved_styles = {}
+            # Parts of the inserted document can be shared with the composed
+            # document, e.g. diagrams.
+            prepared.release(keep=set(self.pkg.iter_parts()))
+            doc = None
+
+        if self.memory is not None:
+            self.memory.update(self.doc, doc, inserted)
+
+    @stage
     def save(self, filename):
+        self.finalize()
         self.doc.save(filename)
 
+    def stream(self, chunk_size=CHUNK_SIZE):
+        """Save the composed document as generator of byte chunks.
+
+        The chunks are produced while the document is being written, so that
+        they can be sent before the whole document has been serialized.
+        """
+        self.finalize()
+        return iter_package(self.pkg, chunk_size)
+
+    @stage
+    def finalize(self):
+        """Complete processing deferred until all documents have been added."""
+        if self._renumbering_pending:
+            self.renumber_ids()
+
+    @property
+    def partnames(self):
+        """Registry of the partnames used in the composed package.
+
+        The composer registers the parts it adds. Parts added to the package
+        without the composer after the first insert are not noticed, except
+        for images, see image_parts_by_sha1.
+        """
+        if self._partnames is None:
+            self._partnames = PartnameRegistry(self.pkg)
+        return self._partnames
+
+    @property
+    def image_parts_by_sha1(self):
+        """Image parts of the composed package by the SHA1 digest of their blob."""
+        # Rebuild the index if images were added without the composer
+        if (
+            self._image_parts_by_sha1 is None
+            or len(self.pkg.image_parts) != self._image_parts_count
+        ):
+            self._image_parts_by_sha1 = {}
+            for img_part in self.pkg.image_parts:
+                self._image_parts_by_sha1.setdefault(img_part.sha1, img_part)
+                self.partnames.add(img_part.partname)
+            self._image_parts_count = len(self.pkg.image_parts)
+        return self._image_parts_by_sha1
+
     def append_index(self):
         section_props = self.doc.element.body.xpath("w:sectPr")
         if section_props:
             return self.doc.element.body.index(section_props[0])
         return len(self.doc.element.body)
 
-    def add_referenced_parts(self, src_part, dst_part, element):
-        rid_elements = xpath(element, ".//*[@r:id]")
-        for rid_element in rid_elements:
+    @stage
+    def add_referenced_parts(self, src_part, dst_part, element, refs=None):
+        if refs is None:
+            refs = ReferenceIndex(element)
+        for rid_element in refs.rid_elements:
             rid = rid_element.get("{%s}id" % NS["r"])
-            rel = src_part.rels[rid]
-            if rel.reltype in REFERENCED_PARTS_IGNORED_RELTYPES:
-                continue
-            new_rel = self.add_relationship(src_part, dst_part, rel)
-            rid_element.set("{%s}id" % NS["r"], new_rel.rId)
+            # Relationships referenced several times are only added once
+            key = (src_part, dst_part, rid)
+            new_rid = self._rid_mapping.get(key)
+            if new_rid is None:
+                rel = src_part.rels[rid]
+                if rel.reltype in REFERENCED_PARTS_IGNORED_RELTYPES:
+                    continue
+                new_rid = self.add_relationship(src_part, dst_part, rel).rId
+                self._rid_mapping[key] = new_rid
+            rid_element.set("{%s}id" % NS["r"], new_rid)
 
     def add_relationship(self, src_part, dst_part, relationship):
         """Add relationship and it's target part"""
@@ -152,40 +317,44 @@ class Composer(object):
             )
             return dst_part.rels[new_rid]
 
-        part = relationship.target_part
+        new_part = self.copy_part(relationship.target_part)
+        return dst_part.rels.get_or_add(relationship.reltype, new_part)
 
-        # Determine next partname
-        name = FILENAME_IDX_RE.match(part.partname).group(1)
-        used_part_numbers = [
-            FILENAME_IDX_RE.match(p.partname).group(2)
-            for p in dst_part.package.iter_parts()
-            if p.partname.startswith(name)
-        ]
-        used_part_numbers = [int(idx) for idx in used_part_numbers if idx is not None]
+    def copy_part(self, part):
+        """Copy the given part and the parts related to it.
 
-        for n in range(1, len(used_part_numbers) + 2):
-            if n not in used_part_numbers:
-                next_part_number = n
-                break
-        next_partname = PackURI("%s%d.%s" % (name, next_part_number, part.partname.ext))
+        Parts referenced several times are only copied once.
+        """
+        new_part = self._part_mapping.get(part)
+        if new_part is not None:
+            return new_part
 
-        new_part = Part(next_partname, part.content_type, part.blob, dst_part.package)
-        new_rel = dst_part.rels.get_or_add(relationship.reltype, new_part)
+        next_partname = self.partnames.next_partname(part.partname)
+        new_part = Part(next_partname, part.content_type, part.blob, self.pkg)
+        self._part_mapping[part] = new_part
 
-        # Sort relationships by rId to get the same rId when adding them to the
-        # new part. This avoids fixing references.
+        # The copied part is not changed, thus its relationships have to keep
+        # their rIds. Add them sorted by rId to keep their order.
         def sort_key(r):
             match = RID_IDX_RE.match(r.rId)
             return int(match.group(1))
 
         for rel in sorted(part.rels.values(), key=sort_key):
-            self.add_relationship(part, new_part, rel)
+            if rel.is_external:
+                target = rel.target_ref
+            else:
+                target = self.copy_part(rel.target_part)
+            new_part.rels.add_relationship(
+                rel.reltype, target, rel.rId, is_external=rel.is_external
+            )
 
-        return new_rel
+        return new_part
 
-    def add_diagrams(self, doc, element):
-        dgm_rels = xpath(element, ".//dgm:relIds[@r:dm]")
-        for dgm_rel in dgm_rels:
+    @stage
+    def add_diagrams(self, doc, element, refs=None):
+        if refs is None:
+            refs = ReferenceIndex(element)
+        for dgm_rel in refs.diagram_rels:
             for item, rt_type in (
                 ("dm", RT.DIAGRAM_DATA),
                 ("lo", RT.DIAGRAM_LAYOUT),
@@ -197,18 +366,15 @@ class Composer(object):
                 new_rid = self.doc.part.relate_to(dm_part, rt_type)
                 dgm_rel.set("{%s}%s" % (NS["r"], item), new_rid)
 
-    def add_images(self, doc, element):
+    @stage
+    def add_images(self, doc, element, refs=None):
         """Add images from the given document used in the given element."""
-        blips = xpath(element, "(.//a:blip|.//asvg:svgBlip)[@r:embed]")
-        for blip in blips:
+        if refs is None:
+            refs = ReferenceIndex(element)
+        for blip in refs.blips:
             rid = blip.get("{%s}embed" % NS["r"])
             img_part = doc.part.rels[rid].target_part
-
-            new_img_part = self.pkg.image_parts._get_by_sha1(img_part.sha1)
-            if new_img_part is None:
-                image = ImageWrapper(img_part)
-                new_img_part = self.pkg.image_parts._add_image_part(image)
-
+            new_img_part = self.add_image_part(img_part)
             new_rid = self.doc.part.relate_to(new_img_part, RT.IMAGE)
             blip.set("{%s}embed" % NS["r"], new_rid)
 
@@ -220,49 +386,94 @@ class Composer(object):
                 new_rel = self.add_relationship(None, self.doc.part, rel)
                 blip.set("{%s}link" % NS["r"], new_rel.rId)
 
-    def add_shapes(self, doc, element):
-        shapes = xpath(element, ".//v:shape/v:imagedata")
-        for shape in shapes:
+    @stage
+    def add_shapes(self, doc, element, refs=None):
+        if refs is None:
+            refs = ReferenceIndex(element)
+        for shape in refs.shape_imagedata:
             rid = shape.get("{%s}id" % NS["r"])
             img_part = doc.part.rels[rid].target_part
-
-            new_img_part = self.pkg.image_parts._get_by_sha1(img_part.sha1)
-            if new_img_part is None:
-                image = ImageWrapper(img_part)
-                new_img_part = self.pkg.image_parts._add_image_part(image)
-
+            new_img_part = self.add_image_part(img_part)
             new_rid = self.doc.part.relate_to(new_img_part, RT.IMAGE)
             shape.set("{%s}id" % NS["r"], new_rid)
 
-    def add_footnotes(self, doc, element):
+    def add_image_part(self, img_part):
+        """Add the given image part unless the composed document already
+        contains an identical image. Returns the image part to reference.
+        """
+        sha1 = self._image_sha1s.get(img_part)
+        if sha1 is None:
+            sha1 = self._image_sha1s[img_part] = img_part.sha1
+
+        new_img_part = self.image_parts_by_sha1.get(sha1)
+        if new_img_part is None:
+            image = ImageWrapper(img_part, sha1=sha1)
+            partname = self.partnames.next_partname(
+                PackURI("/word/media/image.%s" % image.ext)
+            )
+            new_img_part = ImagePart.from_image(image, partname)
+            self.pkg.image_parts.append(new_img_part)
+            self._image_parts_by_sha1[sha1] = new_img_part
+            self._image_parts_count += 1
+        return new_img_part
+
+    @stage
+    def add_footnotes(self, doc, element, refs=None):
         """Add footnotes from the given document used in the given element."""
-        footnotes_refs = element.findall(".//w:footnoteReference", NS)
+        if refs is None:
+            refs = ReferenceIndex(element)
+        footnotes_refs = refs.footnote_refs
 
         if not footnotes_refs:
             return
 
         footnote_part = doc.part.rels.part_with_reltype(RT.FOOTNOTES)
+        src_footnotes = self.source_footnotes(footnote_part)
 
         my_footnote_part = self.footnote_part()
-
-        footnotes = parse_xml(my_footnote_part.blob)
+        footnotes = my_footnote_part.element
         next_id = len(footnotes) + 1
 
         for ref in footnotes_refs:
             id_ = ref.get("{%s}id" % NS["w"])
-            element = parse_xml(footnote_part.blob)
-            footnote = deepcopy(element.find('.//w:footnote[@w:id="%s"]' % id_, NS))
+            footnote = deepcopy(src_footnotes.get(id_))
             footnotes.append(footnote)
             footnote.set("{%s}id" % NS["w"], str(next_id))
             ref.set("{%s}id" % NS["w"], str(next_id))
             next_id += 1
+            self.add_referenced_parts(footnote_part, my_footnote_part, footnote)
 
-        self.add_referenced_parts(footnote_part, my_footnote_part, element)
-
-        my_footnote_part._blob = serialize_part_xml(footnotes)
+    def source_footnotes(self, footnote_part):
+        """The footnotes of the given footnotes part of the inserted document
+        by id. The part is parsed only once per insert.
+        """
+        footnotes = self._src_footnotes.get(footnote_part)
+        if footnotes is None:
+            footnotes = {}
+            element = self.source_element(footnote_part)
+            for footnote in element.iterchildren(FOOTNOTE_TAG):
+                footnotes.setdefault(footnote.get("{%s}id" % NS["w"]), footnote)
+            self._src_footnotes[footnote_part] = footnotes
+        return footnotes
+
+    def source_element(self, part):
+        """The parsed xml of the given part of the inserted document. The part
+        is parsed only once per insert.
+        """
+        element = self._src_elements.get(part)
+        if element is None:
+            element = self._src_elements[part] = parse_xml(part.blob)
+        return element
 
     def footnote_part(self):
-        """The footnote part of the document."""
+        """The footnote part of the document.
+
+        The footnotes are kept as a parsed element tree which is serialized
+        when the document is saved.
+        """
+        if self._footnote_part is not None:
+            return self._footnote_part
+
         try:
             footnote_part = self.doc.part.rels.part_with_reltype(RT.FOOTNOTES)
         except KeyError:
@@ -274,38 +485,85 @@ class Composer(object):
             )
             with open(xml_path, "rb") as f:
                 xml_bytes = f.read()
-            footnote_part = Part(
-                partname, content_type, xml_bytes, self.doc.part.package
+            footnote_part = XmlPart(
+                partname, content_type, parse_xml(xml_bytes), self.pkg
             )
             self.doc.part.relate_to(footnote_part, RT.FOOTNOTES)
+            self.partnames.add(partname)
+
+        if not isinstance(footnote_part, XmlPart):
+            # python-docx loads the footnotes as a binary part. Replace it by
+            # an xml part to avoid parsing and serializing it on every insert.
+            footnote_part = self._replace_by_xml_part(footnote_part, RT.FOOTNOTES)
+
+        self._footnote_part = footnote_part
         return footnote_part
 
+    def _replace_by_xml_part(self, part, reltype):
+        xml_part = XmlPart(
+            part.partname, part.content_type, parse_xml(part.blob), part.package
+        )
+        for rel in part.rels.values():
+            target = rel.target_ref if rel.is_external else rel.target_part
+            xml_part.rels.add_relationship(
+                rel.reltype, target, rel.rId, rel.is_external
+            )
+        for rel in self.doc.part.rels.values():
+            if rel.reltype == reltype and rel.target_part is part:
+                # Replaces the relationship in place, keeping its position
+                self.doc.part.rels.add_relationship(reltype, xml_part, rel.rId)
+        return xml_part
+
+    @property
+    def styles(self):
+        """Registry of the styles of the composed document."""
+        if self._styles is None:
+            self._styles = StyleRegistry(
+                self.doc.styles.element, preserved=self._preserved_styles
+            )
+        return self._styles
+
+    def source_styles(self, doc):
+        """Registry of the styles of the inserted document."""
+        element = doc.styles.element
+        if self._src_styles is None or self._src_styles.element is not element:
+            self._src_styles = StyleRegistry(element)
+        return self._src_styles
+
     def mapped_style_id(self, style_id):
         if style_id not in self._style_id2name:
             return style_id
         return self._style_name2id.get(self._style_id2name[style_id], style_id)
 
+    @stage
     def _create_style_id_mapping(self, doc):
         # Style ids are language-specific, but names not (always), WTF?
         # The inserted document may have another language than the composed one.
         # Thus we map the style id using the style name.
-        self._style_id2name = {s.style_id: s.name for s in doc.styles}
-        self._style_name2id = {s.name: s.style_id for s in self.doc.styles}
-
+        # Styles may have been added without the composer since the last insert
+        if self._styles is not None and self._styles.is_outdated(
+            self.doc.styles.element
+        ):
+            self._styles = None
+        self._style_id2name = self.source_styles(doc).id2name
+        self._style_name2id = self.styles.name2id
+
+    @stage
     def add_styles_from_other_parts(self, doc):
         for reltype in PART_RELTYPES_WITH_STYLES:
             try:
-                el = parse_xml(doc.part.rels.part_with_reltype(reltype).blob)
+                el = self.source_element(doc.part.rels.part_with_reltype(reltype))
             except (KeyError, ValueError):
                 pass
             else:
                 self.add_styles(doc, el)
 
+    @stage
     def retain_formatting_from_default_styles(self, doc):
         """"""
         if not self.preserve_styles:
             return
-        style_id_name_mapping = {s.style_id: s.name for s in doc.styles}
+        style_id_name_mapping = self.source_styles(doc).id2name
         for style_type in WD_STYLE_TYPE:
             # Currently we only support retaining paragraph styles
             if style_type != WD_STYLE_TYPE.PARAGRAPH:
@@ -373,15 +631,16 @@ class Composer(object):
                                         continue
                                     el.append(deepcopy(paragraph_property))
 
-    def add_styles(self, doc, element):
+    @stage
+    def add_styles(self, doc, element, refs=None):
         """Add styles from the given document used in the given element."""
-        our_style_ids = [s.style_id for s in self.doc.styles]
+        if refs is None:
+            refs = ReferenceIndex(element)
+        our_styles = self.styles
+        src_styles = self.source_styles(doc)
+        our_style_ids = our_styles.ids
         # de-duplicate ids and keep order to make sure tests are not flaky
-        used_style_ids = list(
-            OrderedDict.fromkeys(
-                [e.val for e in xpath(element, ".//w:tblStyle|.//w:pStyle|.//w:rStyle")]
-            )
-        )
+        used_style_ids = list(OrderedDict.fromkeys([e.val for e in refs.style_refs]))
 
         for style_id in used_style_ids:
             our_style_id = self.mapped_style_id(style_id)
@@ -389,16 +648,15 @@ class Composer(object):
             # create a copy and append a suffix to the id and name.
             if self.preserve_styles and our_style_id in our_style_ids:
                 if our_style_id not in self._current_preserved_styles:
-                    style_element = deepcopy(doc.styles.element.get_by_id(style_id))
-                    our_style_element = self.doc.styles.element.get_by_id(our_style_id)
+                    style_element = deepcopy(src_styles.get_by_id(style_id))
 
                     # Check if we already have an identical style
-                    preserved_style_ids = self._preserved_styles.get(
+                    preserved_style_ids = our_styles.preserved.get(
                         our_style_id, [our_style_id]
                     )
                     matched_style_id = None
                     for pstyle_id in preserved_style_ids:
-                        our_style_element = self.doc.styles.element.get_by_id(pstyle_id)
+                        our_style_element = our_styles.get_by_id(pstyle_id)
                         if xml_elements_equal(
                             style_element,
                             our_style_element,
@@ -422,98 +680,84 @@ class Composer(object):
                         style_element.styleId = new_id
                         if new_name is not None:
                             style_element.name.val = new_name
-                        self.doc.styles.element.append(style_element)
+                        our_styles.append(style_element)
                         self.add_numberings(doc, style_element)
                         self.add_linked_styles(doc, style_element)
                         self._current_preserved_styles[our_style_id] = new_id
-                        self._preserved_styles.setdefault(
+                        our_styles.preserved.setdefault(
                             our_style_id, [our_style_id]
                         ).append(new_id)
                     else:
                         self._current_preserved_styles[our_style_id] = matched_style_id
 
-                for el in xpath(element, ".//w:tblStyle|.//w:pStyle|.//w:rStyle"):
+                for el in refs.style_refs:
                     el.val = self._current_preserved_styles[our_style_id]
             elif our_style_id not in our_style_ids:
-                style_element = deepcopy(doc.styles.element.get_by_id(style_id))
+                style_element = deepcopy(src_styles.get_by_id(style_id))
                 if style_element is not None:
-                    self.doc.styles.element.append(style_element)
+                    our_styles.append(style_element)
                     self.add_numberings(doc, style_element)
                     self.add_linked_styles(doc, style_element)
             else:
                 # Create a mapping for abstractNumIds used in existing styles
                 # This is used when adding numberings to avoid having multiple
                 # <w:abstractNum> elements for the same style.
-                style_element = doc.styles.element.get_by_id(style_id)
+                style_element = src_styles.get_by_id(style_id)
                 if style_element is not None:
                     num_ids = xpath(style_element, ".//w:numId/@w:val")
                     if num_ids:
-                        anum_ids = xpath(
-                            doc.part.numbering_part.element,
-                            './/w:num[@w:numId="%s"]/w:abstractNumId/@w:val'
-                            % num_ids[0],
-                        )
-                        if anum_ids:
-                            our_style_element = self.doc.styles.element.get_by_id(
-                                our_style_id
-                            )
+                        anum_id = self.source_numbering(doc).abstract_num_id(num_ids[0])
+                        if anum_id is not None:
+                            our_style_element = our_styles.get_by_id(our_style_id)
                             our_num_ids = xpath(our_style_element, ".//w:numId/@w:val")
                             if our_num_ids:
-                                numbering_part = self.numbering_part()
-                                our_anum_ids = xpath(
-                                    numbering_part.element,
-                                    './/w:num[@w:numId="%s"]/w:abstractNumId/@w:val'
-                                    % our_num_ids[0],
+                                our_anum_id = self.numbering.abstract_num_id(
+                                    our_num_ids[0]
                                 )
-                                if our_anum_ids:
-                                    self.anum_id_mapping[int(anum_ids[0])] = int(
-                                        our_anum_ids[0]
+                                if our_anum_id is not None:
+                                    self.anum_id_mapping[int(anum_id)] = int(
+                                        our_anum_id
                                     )
 
             # Replace language-specific style id with our style id
             if our_style_id != style_id and our_style_id is not None:
-                style_elements = xpath(
-                    element,
-                    './/w:tblStyle[@w:val="%(styleid)s"]|'
-                    './/w:pStyle[@w:val="%(styleid)s"]|'
-                    './/w:rStyle[@w:val="%(styleid)s"]' % dict(styleid=style_id),
-                )
-                for el in style_elements:
-                    el.val = our_style_id
-            # Update our style ids
-            our_style_ids = [s.style_id for s in self.doc.styles]
+                for el in refs.style_refs:
+                    if el.val == style_id:
+                        el.val = our_style_id
 
     def add_linked_styles(self, doc, element):
         linked_style_ids = xpath(element, ".//w:link/@w:val")
         if linked_style_ids:
             linked_style_id = linked_style_ids[0]
             our_linked_style_id = self.mapped_style_id(linked_style_id)
-            our_style_ids = [s.style_id for s in self.doc.styles]
-            if our_linked_style_id not in our_style_ids:
-                our_linked_style = doc.styles.element.get_by_id(linked_style_id)
+            if our_linked_style_id not in self.styles.ids:
+                our_linked_style = self.source_styles(doc).get_by_id(linked_style_id)
                 if our_linked_style is not None:
-                    self.doc.styles.element.append(deepcopy(our_linked_style))
+                    self.styles.append(deepcopy(our_linked_style))
 
-    def add_numberings(self, doc, element):
+    @stage
+    def add_numberings(self, doc, element, refs=None):
         """Add numberings from the given document used in the given element."""
+        if refs is None:
+            refs = ReferenceIndex(element)
         # Search for numbering references
-        num_ids = set([n.val for n in xpath(element, ".//w:numId")])
+        num_ids = set([n.val for n in refs.num_ids])
         if not num_ids:
             return
 
         next_num_id, next_anum_id = self._next_numbering_ids()
 
-        src_numbering_part = doc.part.numbering_part
+        src_numbering = self.source_numbering(doc)
 
         for num_id in num_ids:
             if num_id in self.num_id_mapping:
                 continue
 
             # Find the referenced <w:num> element
-            res = src_numbering_part.element.xpath('.//w:num[@w:numId="%s"]' % num_id)
-            if not res:
+            res = src_numbering.get_num(num_id)
+            if res is None:
                 continue
-            num_element = deepcopy(res[0])
+            num_element = deepcopy(res)
             num_element.numId = next_num_id
 
             self.num_id_mapping[num_id] = next_num_id
@@ -521,12 +765,10 @@ class Composer(object):
             anum_id = num_element.xpath("//w:abstractNumId")[0]
             if anum_id.val not in self.anum_id_mapping:
                 # Find the referenced <w:abstractNum> element
-                res = src_numbering_part.element.xpath(
-                    './/w:abstractNum[@w:abstractNumId="%s"]' % anum_id.val
-                )
-                if not res:
+                res = src_numbering.get_abstract_num(anum_id.val)
+                if res is None:
                     continue
-                anum_element = deepcopy(res[0])
+                anum_element = deepcopy(res)
                 self.anum_id_mapping[anum_id.val] = next_anum_id
                 anum_id.val = next_anum_id
                 # anum_element.abstractNumId = next_anum_id
@@ -547,51 +789,18 @@ class Composer(object):
             self._insert_num(num_element)
 
         # Fix references
-        for num_id_ref in xpath(element, ".//w:numId"):
+        for num_id_ref in refs.num_ids:
             num_id_ref.val = self.num_id_mapping.get(num_id_ref.val, num_id_ref.val)
 
     def _next_numbering_ids(self):
-        numbering_part = self.numbering_part()
-
-        # Determine next unused numId (numbering starts with 1)
-        current_num_ids = [n.numId for n in xpath(numbering_part.element, ".//w:num")]
-        if current_num_ids:
-            next_num_id = max(current_num_ids) + 1
-        else:
-            next_num_id = 1
-
-        # Determine next unused abstractNumId (numbering starts with 0)
-        current_anum_ids = [
-            int(n)
-            for n in xpath(numbering_part.element, ".//w:abstractNum/@w:abstractNumId")
-        ]
-        if current_anum_ids:
-            next_anum_id = max(current_anum_ids) + 1
-        else:
-            next_anum_id = 0
-
-        return next_num_id, next_anum_id
+        numbering = self.numbering
+        return numbering.next_num_id, numbering.next_abstract_num_id
 
     def _insert_num(self, element):
-        # Find position of last <w:num> element and insert after that
-        numbering_part = self.numbering_part()
-        nums = numbering_part.element.xpath(".//w:num")
-        if nums:
-            num_index = numbering_part.element.index(nums[-1])
-            numbering_part.element.insert(num_index, element)
-        else:
-            numbering_part.element.append(element)
+        self.numbering.insert_num(element)
 
     def _insert_abstract_num(self, element):
-        # Find position of first <w:num> element
-        # We'll insert <w:abstractNum> before that
-        numbering_part = self.numbering_part()
-        nums = numbering_part.element.xpath(".//w:num")
-        if nums:
-            anum_index = numbering_part.element.index(nums[0])
-        else:
-            anum_index = 0
-        numbering_part.element.insert(anum_index, element)
+        self.numbering.insert_abstract_num(element)
 
     def _replace_mapped_num_id(self, old_id, new_id):
         """Replace a mapped numId with a new one."""
@@ -601,8 +810,27 @@ class Composer(object):
                 self.num_id_mapping[key] = new_id
                 return
 
+    @property
+    def numbering(self):
+        """Index of the numbering definitions of the composed document."""
+        numbering_part = self.numbering_part()
+        element = numbering_part.element
+        if self._numbering is None or self._numbering.is_outdated(element):
+            self._numbering = NumberingIndex(element)
+        return self._numbering
+
+    def source_numbering(self, doc):
+        """Index of the numbering definitions of the inserted document."""
+        numbering_part = doc.part.numbering_part
+        element = numbering_part.element
+        if self._src_numbering is None or self._src_numbering.is_outdated(element):
+            self._src_numbering = NumberingIndex(element)
+        return self._src_numbering
+
     def numbering_part(self):
         """The numbering part of the document."""
+        if self._numbering_part is not None:
+            return self._numbering_part
         try:
             numbering_part = self.doc.part.rels.part_with_reltype(RT.NUMBERING)
         except KeyError:
@@ -619,18 +847,23 @@ class Composer(object):
                 partname, content_type, element, self.doc.part.package
             )
             self.doc.part.relate_to(numbering_part, RT.NUMBERING)
+            self.partnames.add(partname)
+        self._numbering_part = numbering_part
         return numbering_part
 
-    def restart_first_numbering(self, doc, element):
+    @stage
+    def restart_first_numbering(self, doc, element, refs=None):
         if not self.restart_numbering:
             return
-        style_id = xpath(element, ".//w:pStyle/@w:val")
+        if refs is None:
+            refs = ReferenceIndex(element)
+        style_id = refs.paragraph_style_ids()
         if not style_id:
             return
         style_id = style_id[0]
         if style_id in self._numbering_restarted:
             return
-        style_element = self.doc.styles.element.get_by_id(style_id)
+        style_element = self.styles.get_by_id(style_id)
         if style_element is None:
             return
         outline_lvl = xpath(style_element, ".//w:outlineLvl")
@@ -641,7 +874,7 @@ class Composer(object):
 
         # if there is a numId referenced from the paragraph, that numId is
         # relevant, otherwise fall back to the style's numId
-        local_num_id = xpath(element, ".//w:numPr/w:numId/@w:val")
+        local_num_id = refs.numbering_ids()
         if local_num_id:
             num_id = local_num_id[0]
         else:
@@ -650,23 +883,21 @@ class Composer(object):
                 return
             num_id = style_num_id[0]
 
-        numbering_part = self.numbering_part()
-        num_element = xpath(numbering_part.element, './/w:num[@w:numId="%s"]' % num_id)
+        numbering = self.numbering
+        num_element = numbering.get_num(num_id)
 
-        if not num_element:
+        if num_element is None:
             # Styles with no numbering element should not be processed
             return
 
-        anum_id = xpath(num_element[0], ".//w:abstractNumId/@w:val")[0]
-        anum_element = xpath(
-            numbering_part.element, './/w:abstractNum[@w:abstractNumId="%s"]' % anum_id
-        )
-        num_fmt = xpath(anum_element[0], './/w:lvl[@w:ilvl="0"]/w:numFmt/@w:val')
+        anum_id = xpath(num_element, ".//w:abstractNumId/@w:val")[0]
+        anum_element = numbering.get_abstract_num(anum_id)
+        num_fmt = xpath(anum_element, './/w:lvl[@w:ilvl="0"]/w:numFmt/@w:val')
         # Do not restart numbering of bullets
         if num_fmt and num_fmt[0] == "bullet":
             return
 
-        new_num_element = deepcopy(num_element[0])
+        new_num_element = deepcopy(num_element)
         lvl_override = parse_xml(
             '<w:lvlOverride xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
             ' w:ilvl="0"><w:startOverride w:val="1"/></w:lvlOverride>'
@@ -676,9 +907,7 @@ class Composer(object):
         new_num_element.numId = next_num_id
         self._insert_num(new_num_element)
 
-        paragraph_props = xpath(
-            element, './/w:pPr/w:pStyle[@w:val="%s"]/parent::w:pPr' % style_id
-        )
+        paragraph_props = refs.paragraph_properties(style_id)
         num_pr = xpath(paragraph_props[0], ".//w:numPr")
         if num_pr:
             num_pr = num_pr[0]
@@ -710,6 +939,7 @@ class Composer(object):
                 content = f.read()
         header_part = Part(partname, content_type, content, self.doc.part.package)
         self.doc.part.relate_to(header_part, RT.HEADER)
+        self.partnames.add(partname)
         return header_part
 
     def footer_part(self, content=None):
@@ -729,13 +959,61 @@ class Composer(object):
                 content = f.read()
         footer_part = Part(partname, content_type, content, self.doc.part.package)
         self.doc.part.relate_to(footer_part, RT.FOOTER)
+        self.partnames.add(partname)
         return footer_part
 
-    def remove_header_and_footer_references(self, doc, element):
-        refs = xpath(element, ".//w:headerReference|.//w:footerReference")
-        for ref in refs:
+    @stage
+    def remove_header_and_footer_references(self, doc, element, refs=None):
+        if refs is None:
+            refs = ReferenceIndex(element)
+        for ref in refs.header_footer_refs:
             ref.getparent().remove(ref)
 
+    def header_and_footer_parts(self):
+        """The header and footer parts of the document."""
+        return [
+            rel.target_part
+            for rel in self.doc.part.rels.values()
+            if rel.reltype in [RT.HEADER, RT.FOOTER]
+        ]
+
+    @stage
+    def renumber_ids(self):
+        """Renumber bookmarks and the ids of non-visual drawing and image
+        properties in a single pass over the body, headers and footers.
+        """
+        bookmark_start_id = 0
+        bookmark_end_id = 0
+        doc_pr_id = 1
+        c_nv_pr_id = 1
+        for el in self.doc.element.body.iter(
+            BOOKMARK_START_TAG, BOOKMARK_END_TAG, DOC_PR_TAG, C_NV_PR_TAG
+        ):
+            if el.tag == BOOKMARK_START_TAG:
+                el.set("{%s}id" % NS["w"], str(bookmark_start_id))
+                bookmark_start_id += 1
+            elif el.tag == BOOKMARK_END_TAG:
+                el.set("{%s}id" % NS["w"], str(bookmark_end_id))
+                bookmark_end_id += 1
+            elif el.tag == DOC_PR_TAG:
+                el.id = doc_pr_id
+                doc_pr_id += 1
+            else:
+                el.id = c_nv_pr_id
+                c_nv_pr_id += 1
+
+        for part in self.header_and_footer_parts():
+            for el in part.element.iter(DOC_PR_TAG, C_NV_PR_TAG):
+                if el.tag == DOC_PR_TAG:
+                    el.id = doc_pr_id
+                    doc_pr_id += 1
+                else:
+                    el.id = c_nv_pr_id
+                    c_nv_pr_id += 1
+
+        self._renumbering_pending = False
+
+    @stage
     def renumber_bookmarks(self):
         bookmarks_start = xpath(self.doc.element.body, ".//w:bookmarkStart")
         bookmark_id = 0
@@ -748,6 +1026,7 @@ class Composer(object):
             bookmark.set("{%s}id" % NS["w"], str(bookmark_id))
             bookmark_id += 1
 
+    @stage
     def renumber_docpr_ids(self):
         # Ensure that non-visual drawing properties have a unique id
         doc_prs = xpath(self.doc.element.body, ".//wp:docPr")
@@ -756,21 +1035,13 @@ class Composer(object):
             doc_pr.id = doc_pr_id
             doc_pr_id += 1
 
-        parts = [
-            rel.target_part
-            for rel in self.doc.part.rels.values()
-            if rel.reltype
-            in [
-                RT.HEADER,
-                RT.FOOTER,
-            ]
-        ]
-        for part in parts:
+        for part in self.header_and_footer_parts():
             doc_prs = xpath(part.element, ".//wp:docPr")
             for doc_pr in doc_prs:
                 doc_pr.id = doc_pr_id
                 doc_pr_id += 1
 
+    @stage
     def renumber_nvpicpr_ids(self):
         # Ensure that non-visual image properties have a unique id
         c_nv_prs = xpath(self.doc.element.body, ".//pic:cNvPr")
@@ -779,21 +1050,13 @@ class Composer(object):
             c_nv_pr.id = c_nv_pr_id
             c_nv_pr_id += 1
 
-        parts = [
-            rel.target_part
-            for rel in self.doc.part.rels.values()
-            if rel.reltype
-            in [
-                RT.HEADER,
-                RT.FOOTER,
-            ]
-        ]
-        for part in parts:
+        for part in self.header_and_footer_parts():
             c_nv_prs = xpath(part.element, ".//pic:cNvPr")
             for c_nv_pr in c_nv_prs:
                 c_nv_pr.id = c_nv_pr_id
                 c_nv_pr_id += 1
 
+    @stage
     def fix_section_types(self, doc):
         # The section type determines how the contents of the section will be
         # placed relative to the *previous* section.
@@ -812,6 +1075,7 @@ class Composer(object):
         ].start_type
         self.doc.sections[-1].start_type = doc.sections[-1].start_type
 
+    @stage
     def fix_header_and_footers(self, doc):
         """
         The master document usually only has one section, hence its section
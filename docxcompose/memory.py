@@ -0,0 +1,95 @@
+from docx.opc.part import XmlPart
+
+
+# Approximate memory used by a parsed xml element including its attributes
+# and text, measured with lxml for typical WordprocessingML documents.
+ELEMENT_SIZE = 256
+
+
+class RetainedMemory(object):
+    """Estimated memory retained by a composer, updated after each insert.
+
+    The sizes are estimates in bytes: binary parts, e.g. images, are counted
+    with the size of their blobs and xml parts with ELEMENT_SIZE per element.
+    `source` is the size of the last inserted document, which is referenced by
+    the composer until the next insert unless the composer runs in low memory
+    mode. An optional callback is called with this object after each insert.
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.documents = 0
+        self.xml = 0
+        self.blobs = 0
+        self.source = 0
+        # Size of the body of the composed document, which is updated with
+        # the inserted elements instead of being counted again every time.
+        self._body = None
+        # Sizes of the top-level elements of the other xml parts by element,
+        # so that only elements added since the last update are counted.
+        self._elements = {}
+
+    @property
+    def total(self):
+        return self.xml + self.blobs + self.source
+
+    def update(self, doc, source, elements):
+        """Update the sizes after `elements` of the document `source` have
+        been inserted into `doc`. `source` is None if it has been released.
+        """
+        self.documents += 1
+        if self._body is None:
+            self._body = xml_size(doc.element)
+        else:
+            self._body += sum(xml_size(element) for element in elements)
+
+        self.xml, self.blobs = self._body, 0
+        sizes = {}
+        for part in doc.part.package.iter_parts():
+            if part is doc.part:
+                continue
+            if not isinstance(part, XmlPart):
+                self.blobs += len(part.blob)
+                continue
+            self.xml += ELEMENT_SIZE
+            for element in part.element:
+                size = self._elements.get(element)
+                if size is None:
+                    size = xml_size(element)
+                sizes[element] = size
+                self.xml += size
+        self._elements = sizes
+        if source is None:
+            self.source = 0
+        else:
+            self.source = sum(package_size(source.part.package))
+
+        if self.callback is not None:
+            self.callback(self)
+
+    def as_dict(self):
+        return {
+            "documents": self.documents,
+            "xml": self.xml,
+            "blobs": self.blobs,
+            "source": self.source,
+            "total": self.total,
+        }
+
+
+def xml_size(element):
+    """Estimated memory used by the given element and its descendants."""
+    return sum(1 for _ in element.iter()) * ELEMENT_SIZE
+
+
+def package_size(package, skip=None):
+    """Estimated memory used by the xml and binary parts of a package."""
+    xml = blobs = 0
+    for part in package.iter_parts():
+        if part is skip:
+            continue
+        if isinstance(part, XmlPart):
+            xml += xml_size(part.element)
+        else:
+            blobs += len(part.blob)
+    return xml, blobs
@@ -0,0 +1,103 @@
+from docxcompose.utils import NS
+
+
+NUM_TAG = "{%s}num" % NS["w"]
+ABSTRACT_NUM_TAG = "{%s}abstractNum" % NS["w"]
+ABSTRACT_NUM_ID_TAG = "{%s}abstractNumId" % NS["w"]
+NUM_ID_ATTR = "{%s}numId" % NS["w"]
+ABSTRACT_NUM_ID_ATTR = "{%s}abstractNumId" % NS["w"]
+VAL_ATTR = "{%s}val" % NS["w"]
+
+
+def to_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class NumberingIndex(object):
+    """Index of the numbering definitions in a numbering part.
+
+    Provides the <w:num> and <w:abstractNum> elements by their id, the next
+    unused ids and the positions where new definitions are inserted. The
+    numbering part is scanned once, thus new definitions have to be inserted
+    through the index to keep it up to date, see is_outdated.
+    """
+
+    def __init__(self, element):
+        self.element = element
+        self.nums = {}
+        self.abstract_nums = {}
+        # numbering starts with 1, abstract numbering with 0
+        self.next_num_id = 1
+        self.next_abstract_num_id = 0
+        self._first_num = None
+        self._last_num = None
+
+        for el in element.iter(NUM_TAG, ABSTRACT_NUM_TAG):
+            if el.tag == NUM_TAG:
+                if self._first_num is None:
+                    self._first_num = el
+                self._last_num = el
+                self._add_num(el)
+            else:
+                self._add_abstract_num(el)
+        self._length = len(element)
+
+    def _add_num(self, element):
+        num_id = int(element.get(NUM_ID_ATTR))
+        self.nums.setdefault(num_id, element)
+        self.next_num_id = max(self.next_num_id, num_id + 1)
+
+    def _add_abstract_num(self, element):
+        anum_id = int(element.get(ABSTRACT_NUM_ID_ATTR))
+        self.abstract_nums.setdefault(anum_id, element)
+        self.next_abstract_num_id = max(self.next_abstract_num_id, anum_id + 1)
+
+    def is_outdated(self, element):
+        """Whether the given numbering element has been replaced or changed
+        since the index was built.
+        """
+        return element is not self.element or len(element) != self._length
+
+    def get_num(self, num_id):
+        """The <w:num> element with the given numId or None."""
+        return self.nums.get(to_id(num_id))
+
+    def get_abstract_num(self, anum_id):
+        """The <w:abstractNum> element with the given abstractNumId or None."""
+        return self.abstract_nums.get(to_id(anum_id))
+
+    def abstract_num_id(self, num_id):
+        """The abstractNumId referenced by the <w:num> element with the given
+        numId or None.
+        """
+        num = self.get_num(num_id)
+        if num is None:
+            return None
+        anum_id = num.find(ABSTRACT_NUM_ID_TAG)
+        if anum_id is None:
+            return None
+        return anum_id.get(VAL_ATTR)
+
+    def insert_num(self, element):
+        """Insert a <w:num> element before the last <w:num> element."""
+        if self._last_num is None:
+            self.element.append(element)
+            self._first_num = self._last_num = element
+        else:
+            self._last_num.addprevious(element)
+            if self._first_num is self._last_num:
+                self._first_num = element
+        self._add_num(element)
+        self._length += 1
+
+    def insert_abstract_num(self, element):
+        """Insert an <w:abstractNum> element before the first <w:num> element."""
+        if self._first_num is None:
+            self.element.insert(0, element)
+        else:
+            self._first_num.addprevious(element)
+        self._add_abstract_num(element)
+        self._length += 1
@@ -0,0 +1,53 @@
+import re
+
+from docx.opc.packuri import PackURI
+
+
+FILENAME_IDX_RE = re.compile("([a-zA-Z/_-]+)([1-9][0-9]*)?")
+
+
+class PartnameRegistry(object):
+    """Registry of the partnames used in a package.
+
+    Part numbers are grouped by the name prefix, e.g. ``/word/charts/chart``
+    for ``/word/charts/chart3.xml``, so that the next free partname for a
+    prefix can be determined without iterating over all parts of the package.
+    The registry is built once and must be informed about every part added
+    to the package afterwards. Unlike the style registry, it cannot tell
+    cheaply whether it is outdated, thus the package must not be changed by
+    other means while the registry is used.
+    """
+
+    def __init__(self, package):
+        self._numbers = {}
+        self._next_numbers = {}
+        for part in package.iter_parts():
+            self.add(part.partname)
+
+    def add(self, partname):
+        """Register a partname as used."""
+        prefix, number = FILENAME_IDX_RE.match(partname).groups()
+        numbers = self._numbers.setdefault(prefix, set())
+        if number is not None:
+            numbers.add(int(number))
+
+    def next_partname(self, partname):
+        """Return the next free partname with the same prefix and extension
+        as the given partname and register it as used.
+        """
+        prefix = FILENAME_IDX_RE.match(partname).group(1)
+        # Numbers of partnames which start with the same prefix are taken into
+        # account too, e.g. ``/customXml/itemProps1.xml`` for ``/customXml/item``.
+        used_numbers = [
+            numbers for key, numbers in self._numbers.items() if key.startswith(prefix)
+        ]
+        # Part numbers are never released, thus the lowest free number can
+        # only increase and we can continue searching where we stopped.
+        number = self._next_numbers.get(prefix, 1)
+        while any(number in numbers for numbers in used_numbers):
+            number += 1
+        self._next_numbers[prefix] = number
+
+        next_partname = PackURI("%s%d.%s" % (prefix, number, partname.ext))
+        self.add(next_partname)
+        return next_partname
@@ -0,0 +1,106 @@
+import logging
+import os
+import resource
+import signal
+import socket
+import time
+
+
+logger = logging.getLogger("docxcompose")
+
+# Delay before replacing a worker which failed, to avoid restarting a
+# failing worker in a tight loop.
+RESTART_DELAY = 1
+
+SHUTDOWN_SIGNALS = {signal.SIGTERM, signal.SIGINT}
+
+
+def memory_usage():
+    """The resident set size of the current process in bytes."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        # Without procfs, fall back to the peak usage in kilobytes
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def bind_socket(host, port, backlog=128):
+    """Return a listening socket which can be shared by worker processes."""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    return sock
+
+
+class Supervisor(object):
+    """Runs a number of forked worker processes sharing a listening socket.
+
+    Workers which exit, e.g. because they are recycled, are replaced by new
+    ones. On SIGTERM or SIGINT, the workers are asked to shut down gracefully
+    and the supervisor returns once all of them have exited.
+    """
+
+    def __init__(self, worker, processes):
+        # Called with the listening socket in each worker process
+        self.worker = worker
+        self.processes = processes
+        self.pids = set()
+        self.stopping = False
+
+    def run(self, sock):
+        for signum in SHUTDOWN_SIGNALS:
+            signal.signal(signum, self.stop)
+
+        for _ in range(self.processes):
+            self.spawn(sock)
+
+        while self.pids:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            self.pids.discard(pid)
+            if self.stopping:
+                continue
+
+            exit_code = os.waitstatus_to_exitcode(status)
+            if exit_code == 0:
+                logger.info("Worker %s exited, starting a new one.", pid)
+            else:
+                logger.warning("Worker %s failed with %s.", pid, exit_code)
+                time.sleep(RESTART_DELAY)
+            self.spawn(sock)
+
+    def spawn(self, sock):
+        # The shutdown signals are blocked while forking, so that no worker
+        # is started once stopping and every started worker is signaled.
+        signal.pthread_sigmask(signal.SIG_BLOCK, SHUTDOWN_SIGNALS)
+        try:
+            if self.stopping:
+                return
+            pid = os.fork()
+            if pid == 0:
+                for signum in SHUTDOWN_SIGNALS:
+                    signal.signal(signum, signal.SIG_DFL)
+                signal.pthread_sigmask(signal.SIG_UNBLOCK, SHUTDOWN_SIGNALS)
+                exit_code = 0
+                try:
+                    self.worker(sock)
+                except BaseException:
+                    logger.exception("Worker %s failed.", os.getpid())
+                    exit_code = 1
+                finally:
+                    os._exit(exit_code)
+            self.pids.add(pid)
+        finally:
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, SHUTDOWN_SIGNALS)
+
+    def stop(self, signum, frame):
+        self.stopping = True
+        for pid in self.pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
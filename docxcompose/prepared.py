@@ -0,0 +1,85 @@
+from copy import deepcopy
+
+from docx import Document
+from docx.document import Document as DocxDocument
+from docx.opc.part import XmlPart
+from docx.oxml.section import CT_SectPr
+
+from docxcompose.properties import CustomProperties
+from docxcompose.references import ReferenceIndex
+from docxcompose.styles import StyleRegistry
+
+
+class PreparedDocument(object):
+    """A document loaded and pre-processed for being inserted by a composer.
+
+    Preparing a document does not depend on the composed document, thus
+    multiple documents can be prepared concurrently. The document can be
+    given as document, path or file-like object.
+    """
+
+    def __init__(self, doc, remove_property_fields=True, copy_body=True):
+        # Documents loaded here are not used elsewhere and can be released
+        self.loaded = not isinstance(doc, DocxDocument)
+        if self.loaded:
+            doc = Document(doc)
+        self.doc = doc
+
+        # Remove custom property fields but keep the values
+        if remove_property_fields:
+            CustomProperties(doc).dissolve_all_fields()
+
+        self.styles = StyleRegistry(doc.styles.element)
+        self._body = self._copy_body() if copy_body else None
+
+    def _copy_body(self):
+        body = []
+        for element in self.doc.element.body:
+            if isinstance(element, CT_SectPr):
+                """This will lead to unexpected behaviors, for example if one
+                of the added documents with landscape set for the last section
+                the page orientation will get lost here. Still this is mostly
+                ok, and otherwise we would need to create a section for each
+                document added, i.e. move the properties into the last
+                paragraph and also decide which properties we allow to overwrite
+                and which should inherit from the main template."""
+                continue
+            element = deepcopy(element)
+            # Collect all references of the element in a single pass
+            body.append((element, ReferenceIndex(element)))
+        return body
+
+    def body_elements(self):
+        """Copies of the body elements with their references.
+
+        Copies made while preparing are handed out only once, afterwards the
+        body is copied again.
+        """
+        body, self._body = self._body, None
+        if body is None:
+            body = self._copy_body()
+        return body
+
+    def release(self, keep=()):
+        """Drop the document once it has been inserted.
+
+        If the document was loaded by this object, the xml trees and blobs of
+        its parts except the parts in `keep` are cleared. They are freed right
+        away instead of once the reference cycles of the package are
+        collected. Documents given as document are left intact.
+        """
+        doc, self.doc = self.doc, None
+        self.styles = None
+        self._body = None
+        if not self.loaded:
+            return
+
+        for part in list(doc.part.package.iter_parts()):
+            if part in keep:
+                continue
+            if isinstance(part, XmlPart):
+                part._element = None
+            else:
+                part._blob = None
+        doc._element = None
+        doc._Document__body = None
@@ -1,5 +1,6 @@
 import importlib.resources as importlib_resources
 import re
+from contextlib import contextmanager
 from copy import deepcopy
 from datetime import datetime
 
@@ -11,7 +12,6 @@ from docx.opc.packuri import PackURI
 from docx.opc.part import Part
 from docx.oxml import parse_xml
 from docx.oxml.coreprops import CT_CoreProperties
-from lxml.etree import FunctionNamespace
 from lxml.etree import QName
 
 from docxcompose.utils import NS
@@ -28,6 +28,18 @@ CUSTOM_PROPERTY_TYPES = {
     "float": '<vt:r8 xmlns:vt="{}"/>'.format(NS["vt"]),
 }
 MIN_PID = 2  # Property IDs have to start with 2
+PROPERTY_TAG = "{%s}property" % NS["cp"]
+SIMPLE_FIELD_TAG = "{%s}fldSimple" % NS["w"]
+INSTR_TEXT_TAG = "{%s}instrText" % NS["w"]
+INSTR_ATTR = "{%s}instr" % NS["w"]
+RUN_TAG = "{%s}r" % NS["w"]
+FLD_CHAR_TAG = "{%s}fldChar" % NS["w"]
+FLD_CHAR_TYPE_ATTR = "{%s}fldCharType" % NS["w"]
+LANG_TAG = "{%s}lang" % NS["w"]
+LANG_VAL_ATTR = "{%s}val" % NS["w"]
+
+# Marks a language which has not been determined yet
+_UNKNOWN = object()
 
 
 def value2vt(value):
@@ -79,16 +91,6 @@ def is_text_property(property):
     return tag in ["bstr", "lpstr", "lpwstr"]
 
 
-ns = FunctionNamespace(None)
-
-
-# lxml doesn't support XPath 2.0 functions
-# Thus we implement lower-case() as an extension function
-@ns("lower-case")
-def lower_case(context, a):
-    return [el.lower() for el in a]
-
-
 class CustomProperties(object):
     """Custom doc properties stored in ``/docProps/custom.xml``.
     Allows updating of doc properties in a document.
@@ -98,7 +100,11 @@ class CustomProperties(object):
         self.doc = doc
         self.part = None
         self._element = None
-        self.language = self.get_doc_language()
+        # Changes are serialized only once at the end of a batch
+        self._batch_depth = 0
+        self._changed = False
+        self._renumbering_pending = False
+        self._language = _UNKNOWN
 
         try:
             part = doc.part.package.part_related_by(RT.CUSTOM_PROPERTIES)
@@ -107,6 +113,31 @@ class CustomProperties(object):
         else:
             self.part = part
             self._element = parse_xml(part.blob)
+        self._build_index()
+
+    def _build_index(self):
+        """Index the properties by their lower-cased name, as names are case
+        insensitive, and determine the next free pid.
+        """
+        self._properties = {}
+        pids = []
+        for prop in self._element.iterchildren(PROPERTY_TAG):
+            name = prop.get("name")
+            if name is not None:
+                # The first of several properties with the same name is used
+                self._properties.setdefault(name.lower(), prop)
+            try:
+                pids.append(int(prop.get("pid")))
+            except (TypeError, ValueError):
+                # Properties with a missing or invalid pid are tolerated
+                pass
+        self._next_pid = max(pids) + 1 if pids else MIN_PID
+
+    def _get_property(self, key):
+        prop = self._properties.get(key.lower())
+        if prop is None:
+            raise KeyError(key)
+        return prop
 
     def _part_template(self):
         return (
@@ -115,7 +146,28 @@ class CustomProperties(object):
             .read_bytes()
         )
 
+    @contextmanager
+    def batch(self):
+        """Apply several changes and serialize the custom properties only once
+        at the end instead of after every change.
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth and self._changed:
+                self._update_part()
+
     def _update_part(self):
+        if self._batch_depth:
+            self._changed = True
+            return
+        self._changed = False
+
+        if self._renumbering_pending:
+            self._renumber_pids()
+
         if self.part is None:
             # Create a new part for custom properties
             partname = PackURI("/docProps/custom.xml")
@@ -126,31 +178,21 @@ class CustomProperties(object):
                 self.doc.part.package,
             )
             self.doc.part.package.relate_to(self.part, RT.CUSTOM_PROPERTIES)
-            self._element = parse_xml(self.part.blob)
         else:
             self.part._blob = serialize_part_xml(self._element)
 
     def __getitem__(self, key):
         """Get the value of a property."""
-        props = xpath(
-            self._element, './/cp:property[lower-case(@name)="{}"]'.format(key.lower())
-        )
-
-        if not props:
-            raise KeyError(key)
-
-        return vt2value(props[0][0])
+        return vt2value(self._get_property(key)[0])
 
     def __setitem__(self, key, value):
         """Set the value of a property."""
-        props = xpath(
-            self._element, './/cp:property[lower-case(@name)="{}"]'.format(key.lower())
-        )
-        if not props:
+        prop = self._properties.get(key.lower())
+        if prop is None:
             self.add(key, value)
             return
 
-        value_el = props[0][0]
+        value_el = prop[0]
         new_value_el = value2vt(value)
         value_el.getparent().replace(value_el, new_value_el)
 
@@ -158,21 +200,42 @@ class CustomProperties(object):
 
     def __delitem__(self, key):
         """Delete a property."""
-        props = xpath(
-            self._element, './/cp:property[lower-case(@name)="{}"]'.format(key.lower())
-        )
-
-        if not props:
-            raise KeyError(key)
+        prop = self._get_property(key)
+        prop.getparent().remove(prop)
+
+        # Another property with the same name may become visible
+        name = key.lower()
+        del self._properties[name]
+        for other in self._element.iterchildren(PROPERTY_TAG):
+            if other.get("name", "").lower() == name:
+                self._properties[name] = other
+                break
+
+        self._renumbering_pending = True
+        self._update_part()
 
-        props[0].getparent().remove(props[0])
-        # Renumber pids
+    def _renumber_pids(self):
         pid = MIN_PID
         for prop in self._element:
             prop.set("pid", str(pid))
             pid += 1
+        self._next_pid = pid
+        self._renumbering_pending = False
 
-        self._update_part()
+    @property
+    def language(self):
+        """The language used to format dates.
+
+        It is only determined when needed, as it requires searching the
+        document, and then kept.
+        """
+        if self._language is _UNKNOWN:
+            self._language = self.get_doc_language()
+        return self._language
+
+    @language.setter
+    def language(self, language):
+        self._language = language
 
     def get_doc_language(self):
         """We actually should determine the correct language for each field.
@@ -180,15 +243,13 @@ class CustomProperties(object):
         the document, and if None are found, from the w:lang tag in the default
         style.
         """
-        lang_tags = xpath(self.doc.element, ".//w:lang")
-        lang_tags.extend(xpath(self.doc.styles.element, ".//w:lang"))
-        # keep the first tag containing a setting for Latin languages
-        latin_lang_key = "{{{}}}val".format(NS["w"])
-        lang_tags = [tag for tag in lang_tags if latin_lang_key in tag.keys()]
-        if lang_tags:
-            language = lang_tags[0].attrib[latin_lang_key]
-            # babel does not support dashes in combined language codes
-            return language.replace("-", "_")
+        for element in (self.doc.element, self.doc.styles.element):
+            # use the first tag containing a setting for Latin languages
+            for lang_tag in element.iter(LANG_TAG):
+                language = lang_tag.get(LANG_VAL_ATTR)
+                if language is not None:
+                    # babel does not support dashes in combined language codes
+                    return language.replace("-", "_")
         return None
 
     def nullify(self, key):
@@ -196,26 +257,13 @@ class CustomProperties(object):
         text.
         """
 
-        props = xpath(
-            self._element, './/cp:property[lower-case(@name)="{}"]'.format(key.lower())
-        )
-
-        if not props:
-            raise KeyError(key)
-
-        if is_text_property(props[0][0]):
+        if is_text_property(self._get_property(key)[0]):
             self[key] = ""
         else:
             del self[key]
 
     def __contains__(self, item):
-        props = xpath(
-            self._element, './/cp:property[lower-case(@name)="{}"]'.format(item.lower())
-        )
-        if props:
-            return True
-        else:
-            return False
+        return item.lower() in self._properties
 
     def get(self, key, default=None):
         try:
@@ -225,11 +273,8 @@ class CustomProperties(object):
 
     def add(self, name, value):
         """Add a property."""
-        pids = [int(pid) for pid in xpath(self._element, ".//cp:property/@pid")]
-        if pids:
-            pid = max(pids) + 1
-        else:
-            pid = MIN_PID
+        pid = self._next_pid
+        self._next_pid += 1
         prop = parse_xml('<cp:property xmlns:cp="{}"/>'.format(NS["cp"]))
         prop.set("fmtid", CUSTOM_PROPERTY_FMTID)
         prop.set("name", name)
@@ -237,6 +282,7 @@ class CustomProperties(object):
         value_el = value2vt(value)
         prop.append(value_el)
         self._element.append(prop)
+        self._properties.setdefault(name.lower(), prop)
 
         self._update_part()
 
@@ -262,8 +308,10 @@ class CustomProperties(object):
         return [(prop.get("name"), vt2value(prop[0])) for prop in props]
 
     def set_properties(self, properties):
-        for name, value in properties.items():
-            self.set(name, value)
+        """Set the values of the given properties, adding missing ones."""
+        with self.batch():
+            for name, value in properties.items():
+                self[name] = value
 
     def find_docprops_in_document(self, name=None):
         """This method searches for all doc-properties in the document and
@@ -298,22 +346,40 @@ class CustomProperties(object):
         return docprops
 
     def _find_docprops_in(self, element, name=None):
-        # First we search for the simple fields:
-        sfield_nodes = xpath(
-            element, ".//w:fldSimple[contains(@w:instr, 'DOCPROPERTY ')]"
-        )
+        # Find the simple and complex fields in a single walk of the element
+        sfield_nodes = []
+        cfield_nodes = []
+        for node in element.iter(SIMPLE_FIELD_TAG, INSTR_TEXT_TAG):
+            if node.tag == SIMPLE_FIELD_TAG:
+                if "DOCPROPERTY " in node.get(INSTR_ATTR, ""):
+                    sfield_nodes.append(node)
+            elif node.text and "DOCPROPERTY " in node.text:
+                cfield_nodes.append(node)
 
         docprops = [SimpleField(sfield_node) for sfield_node in sfield_nodes]
 
-        # Now for the complex fields
-        cfield_nodes = xpath(element, ".//w:instrText[contains(.,'DOCPROPERTY ')]")
-
-        docprops.extend([ComplexField(cfield_node) for cfield_node in cfield_nodes])
+        # The runs of each paragraph containing complex fields are scanned
+        # only once
+        spans = {}
+        for cfield_node in cfield_nodes:
+            w_p = cfield_node.getparent().getparent()
+            if w_p not in spans:
+                spans[w_p] = scan_complex_fields(w_p)
+            docprops.append(ComplexField(cfield_node, spans[w_p]))
 
         if name is not None:
             docprops = filter(lambda prop: prop.name == name, docprops)
         return docprops
 
+    def find_docprops_by_name(self):
+        """All doc-properties in the document grouped by their name, found
+        with a single walk of the document.
+        """
+        docprops = {}
+        for docprop in self.find_docprops_in_document():
+            docprops.setdefault(docprop.name, []).append(docprop)
+        return docprops
+
     def update_all(self):
         """Update all the document's doc-properties."""
         docprops = self.find_docprops_in_document()
@@ -338,6 +404,22 @@ class CustomProperties(object):
         for docprop in docprops:
             docprop.replace_field_with_value()
 
+    def dissolve_all_fields(self):
+        """Remove the fields of all properties but keep their value.
+
+        Same as calling `dissolve_fields` for every property, but the
+        document is searched only once.
+        """
+        names = set(self.keys())
+        if not names:
+            return
+
+        for name, docprops in self.find_docprops_by_name().items():
+            if name not in names:
+                continue
+            for docprop in docprops:
+                docprop.replace_field_with_value()
+
 
 class FieldBase(object):
     """Class used to represent a docproperty field in the document.xml."""
@@ -411,6 +493,64 @@ class SimpleField(FieldBase):
         parent.insert(index, w_r)
 
 
+class FieldSpan(object):
+    """The runs of a complex field in a paragraph.
+
+    `instr_runs` are the runs between the begin and the separate run, or the
+    end run if there is no separate run, and `value_runs` those between the
+    separate and the end run. Runs of nested fields are included.
+    """
+
+    def __init__(self, begin_run):
+        self.begin_run = begin_run
+        self.instr_runs = []
+        self.separate_run = None
+        self.value_runs = []
+        self.end_run = None
+
+    def add_run(self, run):
+        if self.separate_run is None:
+            self.instr_runs.append(run)
+        else:
+            self.value_runs.append(run)
+
+
+def scan_complex_fields(w_p):
+    """Walk the runs of the given paragraph once and return the spans of its
+    complex fields by their <w:instrText> nodes.
+
+    Nested fields are tracked with a stack, so that the separate and end runs
+    of a nested field are not mistaken for those of the enclosing field.
+    Fields without end run have no end_run.
+    """
+    spans = {}
+    stack = []
+    for run in w_p.iterchildren(RUN_TAG):
+        fld_char = run.find(FLD_CHAR_TAG)
+        fld_char_type = None if fld_char is None else fld_char.get(FLD_CHAR_TYPE_ATTR)
+
+        if fld_char_type == "begin":
+            for span in stack:
+                span.add_run(run)
+            stack.append(FieldSpan(run))
+        elif fld_char_type == "separate" and stack and stack[-1].separate_run is None:
+            for span in stack[:-1]:
+                span.add_run(run)
+            stack[-1].separate_run = run
+        elif fld_char_type == "end" and stack:
+            stack.pop().end_run = run
+            for span in stack:
+                span.add_run(run)
+        else:
+            for span in stack:
+                span.add_run(run)
+
+        if stack:
+            for instr_text in run.iterchildren(INSTR_TEXT_TAG):
+                spans[instr_text] = stack[-1]
+    return spans
+
+
 class InvalidComplexField(Exception):
     """This exception is raised when a complex field cannot
     be handled correctly."""
@@ -421,21 +561,26 @@ class ComplexField(FieldBase):
     containing <w:fldChar w:fldCharType="begin"/> and <w:fldChar w:fldCharType="end"/>.
     In these fields, the actual value is stored in <w:r> nodes that come after a
     <w:r><w:fldChar w:fldCharType="separate"/></w:r> node.
+
+    The runs of the field are determined once, see scan_complex_fields. The
+    spans of all fields of the paragraph can be given when they are known.
     """
 
-    XPATH_PRECEDING_BEGINS = (
-        './preceding-sibling::w:r/w:fldChar[@w:fldCharType="begin"]/..'
-    )
-    XPATH_FOLLOWING_ENDS = './following-sibling::w:r/w:fldChar[@w:fldCharType="end"]/..'
-    XPATH_FOLLOWING_SEPARATES = (
-        './following-sibling::w:r/w:fldChar[@w:fldCharType="separate"]/..'
-    )
     XPATH_TEXTS = "w:instrText"
 
-    def __init__(self, field_node):
+    def __init__(self, field_node, spans=None):
         # run and paragraph containing the field
         self.w_r = field_node.getparent()
         self.w_p = self.w_r.getparent()
+        if spans is None:
+            spans = scan_complex_fields(self.w_p)
+        self._span = spans.get(field_node)
+        if self._span is None:
+            msg = "Complex field without begin node is not supported"
+            raise InvalidComplexField(msg)
+        if self._span.end_run is None:
+            msg = "Complex field without end node is not supported"
+            raise InvalidComplexField(msg)
         super(ComplexField, self).__init__(field_node)
 
     def _get_fieldname_string(self):
@@ -443,71 +588,48 @@ class ComplexField(FieldBase):
         so we look for all the instrText nodes between the begin and either
         separate or end runs
         """
-        separate_run = self.get_separate_run()
-        last = (
-            self.w_p.index(separate_run)
-            if separate_run is not None
-            else self.w_p.index(self.end_run)
-        )
-        runs = [run for run in self._runs if self.w_p.index(run) < last]
         texts = []
-        for run in runs:
+        for run in self._span.instr_runs:
             texts.extend(xpath(run, self.XPATH_TEXTS))
         return "".join([each.text for each in texts])
 
     @property
     def begin_run(self):
-        begins = xpath(self.w_r, self.XPATH_PRECEDING_BEGINS)
-        if not begins:
-            msg = "Complex field without begin node is not supported"
-            raise InvalidComplexField(msg)
-        return begins[-1]
+        return self._span.begin_run
 
     @property
     def end_run(self):
-        if not hasattr(self, "_end_run"):
-            ends = xpath(self.w_r, self.XPATH_FOLLOWING_ENDS)
-            if not ends:
-                msg = "Complex field without end node is not supported"
-                raise InvalidComplexField(msg)
-            self._end_run = ends[0]
-        return self._end_run
+        return self._span.end_run
 
     def get_separate_run(self):
         """The ooxml format standard says that the separate node is optional,
         so we check whether we find one in our complex field, otherwise
         we return None."""
-        separates = xpath(self.w_r, self.XPATH_FOLLOWING_SEPARATES)
-        if not separates:
-            return None
-
-        separate = separates[0]
-        if not self.w_p.index(separate) < self.w_p.index(self.end_run):
-            return None
-
-        return separate
+        return self._span.separate_run
 
     @property
     def _runs(self):
-        return xpath(self.begin_run, "./following-sibling::w:r")
+        """All runs following the begin run up to the end run."""
+        span = self._span
+        runs = list(span.instr_runs)
+        if span.separate_run is not None:
+            runs.append(span.separate_run)
+        runs.extend(span.value_runs)
+        runs.append(span.end_run)
+        return runs
+
+    def _in_paragraph(self, runs):
+        # Runs of a nested field may have been removed already
+        return [run for run in runs if run.getparent() is self.w_p]
 
     def get_runs_for_update(self):
         """
         Get run fields after <w:r><w:fldChar w:fldCharType="separate"/></w:r>
         """
-        end_index = self.w_p.index(self.end_run)
-        separate_run = self.get_separate_run()
-
         # if there is no separate, we have no value to update
-        if separate_run is None:
+        if self._span.separate_run is None:
             return []
-
-        separate_index = self.w_p.index(separate_run)
-        return [
-            run
-            for run in self._runs
-            if self.w_p.index(run) > separate_index and self.w_p.index(run) < end_index
-        ]
+        return self._in_paragraph(self._span.value_runs)
 
     def get_runs_to_replace_field_with_value(self):
         """
@@ -515,19 +637,14 @@ class ComplexField(FieldBase):
         and <w:fldChar w:fldCharType="separate"/> including boundaries,
         plus the <w:fldChar w:fldCharType="end"/> node
         """
-        separate_run = self.get_separate_run()
-
+        span = self._span
+        runs = [span.begin_run] + span.instr_runs
         # If there is no separate, then the field has no value
         # meaning we can remove the whole field.
-        if separate_run is None:
-            end_index = self.w_p.index(self.end_run)
-            runs = [run for run in self._runs if self.w_p.index(run) < end_index]
-        else:
-            separate_index = self.w_p.index(separate_run)
-            runs = [run for run in self._runs if self.w_p.index(run) <= separate_index]
-        runs.insert(0, self.begin_run)
-        runs.append(self.end_run)
-        return runs
+        if span.separate_run is not None:
+            runs.append(span.separate_run)
+        runs.append(span.end_run)
+        return self._in_paragraph(runs)
 
     def update(self, value, language=None):
         runs_after_separate = self.get_runs_for_update()
@@ -556,6 +673,7 @@ class ComplexField(FieldBase):
                 text = xpath(run, ".//w:t")
                 if text:
                     self.w_p.remove(run)
+                    self._span.value_runs.remove(run)
         else:
             # create a <w:fldChar w:fldCharType="separate"/> run using
             # the <w:fldChar w:fldCharType="begin"/> run as a template.
@@ -581,9 +699,22 @@ class ComplexField(FieldBase):
 
             # insert newly created nodes after the node containing the
             # docproperty field code in <w:instrText>.
-            docprop_index = self.w_p.index(self.w_r)
-            self.w_p.insert(docprop_index + 1, separate_run)
-            self.w_p.insert(docprop_index + 2, value_run)
+            self.w_r.addnext(separate_run)
+            separate_run.addnext(value_run)
+
+            # the runs following the new separate run are now part of the
+            # value.
+            span = self._span
+            if self.w_r in span.instr_runs:
+                index = span.instr_runs.index(self.w_r) + 1
+            else:
+                index = len(span.instr_runs)
+            value_runs = [value_run] + span.instr_runs[index:]
+            if span.separate_run is not None:
+                value_runs.append(span.separate_run)
+            span.value_runs = value_runs + span.value_runs
+            span.instr_runs = span.instr_runs[:index]
+            span.separate_run = separate_run
 
     def replace_field_with_value(self):
         # Get list of <w:r> nodes for removal
@@ -0,0 +1,104 @@
+from lxml.etree import Element
+
+from docxcompose.utils import NS
+
+
+R_ID = "{%s}id" % NS["r"]
+R_EMBED = "{%s}embed" % NS["r"]
+R_DM = "{%s}dm" % NS["r"]
+W_VAL = "{%s}val" % NS["w"]
+
+BLIP_TAGS = set(
+    [
+        "{%s}blip" % NS["a"],
+        "{%s}svgBlip" % NS["asvg"],
+    ]
+)
+STYLE_REF_TAGS = set(
+    [
+        "{%s}tblStyle" % NS["w"],
+        "{%s}pStyle" % NS["w"],
+        "{%s}rStyle" % NS["w"],
+    ]
+)
+HEADER_FOOTER_REF_TAGS = set(
+    [
+        "{%s}headerReference" % NS["w"],
+        "{%s}footerReference" % NS["w"],
+    ]
+)
+IMAGEDATA_TAG = "{%s}imagedata" % NS["v"]
+SHAPE_TAG = "{%s}shape" % NS["v"]
+NUM_ID_TAG = "{%s}numId" % NS["w"]
+NUM_PR_TAG = "{%s}numPr" % NS["w"]
+P_STYLE_TAG = "{%s}pStyle" % NS["w"]
+P_PR_TAG = "{%s}pPr" % NS["w"]
+FOOTNOTE_REF_TAG = "{%s}footnoteReference" % NS["w"]
+DIAGRAM_RELIDS_TAG = "{%s}relIds" % NS["dgm"]
+
+
+class ReferenceIndex(object):
+    """Index of all references contained in an element.
+
+    The descendants of the element are walked once and the referencing
+    elements are collected by kind, in document order. This avoids running a
+    separate XPath query over the whole element for every kind of reference.
+    """
+
+    def __init__(self, element):
+        self.rid_elements = []
+        self.blips = []
+        self.shape_imagedata = []
+        self.style_refs = []
+        self.num_ids = []
+        self.footnote_refs = []
+        self.diagram_rels = []
+        self.header_footer_refs = []
+
+        for el in element.iterdescendants(Element):
+            tag = el.tag
+            if R_ID in el.attrib:
+                self.rid_elements.append(el)
+            if tag in STYLE_REF_TAGS:
+                self.style_refs.append(el)
+            elif tag == NUM_ID_TAG:
+                self.num_ids.append(el)
+            elif tag in BLIP_TAGS:
+                if R_EMBED in el.attrib:
+                    self.blips.append(el)
+            elif tag == IMAGEDATA_TAG:
+                if el.getparent().tag == SHAPE_TAG:
+                    self.shape_imagedata.append(el)
+            elif tag == FOOTNOTE_REF_TAG:
+                self.footnote_refs.append(el)
+            elif tag == DIAGRAM_RELIDS_TAG:
+                if R_DM in el.attrib:
+                    self.diagram_rels.append(el)
+            elif tag in HEADER_FOOTER_REF_TAGS:
+                self.header_footer_refs.append(el)
+
+    def paragraph_style_ids(self):
+        """Ids of the paragraph styles referenced, in document order."""
+        return [
+            el.get(W_VAL)
+            for el in self.style_refs
+            if el.tag == P_STYLE_TAG and el.get(W_VAL) is not None
+        ]
+
+    def paragraph_properties(self, style_id):
+        """Paragraph properties referencing the given paragraph style."""
+        return [
+            el.getparent()
+            for el in self.style_refs
+            if el.tag == P_STYLE_TAG
+            and el.get(W_VAL) == style_id
+            and el.getparent().tag == P_PR_TAG
+        ]
+
+    def numbering_ids(self):
+        """Ids of the numberings referenced from numbering properties."""
+        return [
+            el.get(W_VAL)
+            for el in self.num_ids
+            if el.getparent().tag == NUM_PR_TAG and el.get(W_VAL) is not None
+        ]
@@ -2,22 +2,423 @@ try:
     from aiohttp import web
 except ImportError:
     raise SystemExit("Install with server extra to use this command.")
+import asyncio
+import hashlib
 import importlib.metadata
+import json
 import logging
-import os.path
-import tempfile
+import os
+import re
+import shutil
+import signal
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
+from contextlib import contextmanager
+from contextlib import ExitStack
+from io import BytesIO
+from tempfile import mkdtemp
+from tempfile import SpooledTemporaryFile
+from zipfile import BadZipFile
+from zipfile import ZipFile
 
 from docx import Document
 
 from docxcompose.composer import Composer
+from docxcompose.prefork import bind_socket
+from docxcompose.prefork import memory_usage
+from docxcompose.prefork import Supervisor
+from docxcompose.snapshot import DocumentSnapshot
 from docxcompose.utils import to_bool
 
 
+HOST = "0.0.0.0"
+PORT = 8080
 CHUNK_SIZE = 65536
+SPOOL_SIZE = 10 * 1024 * 1024
+TEMPLATE_CACHE_SIZE = 100 * 1024 * 1024
+JOB_TTL = 3600
+JOB_EXPIRY_INTERVAL = 60
+JOB_ID_RE = re.compile("[0-9a-f]{32}")
+TEMPLATE_HASH_RE = re.compile("[0-9a-f]{64}")
+# Number of chunks produced ahead of the client when streaming
+STREAM_QUEUE_SIZE = 4
 logger = logging.getLogger("docxcompose")
 version = importlib.metadata.version("docxcompose")
 
 
+class ComposePool(object):
+    """Runs compositions in a thread or process pool with a limited number
+    of workers, off the event loop.
+
+    Compositions which cannot be started immediately are queued. Once more
+    than `max_queue` compositions are waiting, further requests are rejected.
+    """
+
+    def __init__(self, executor="thread", workers=None, max_queue=None):
+        if workers is None:
+            workers = os.cpu_count() or 1
+        self.streams = None
+        if executor == "thread":
+            self.executor = ThreadPoolExecutor(max_workers=workers)
+            # Composed documents are serialized in a pool of their own, so
+            # that streaming them does not wait for queued compositions.
+            self.streams = ThreadPoolExecutor(max_workers=workers)
+        elif executor == "process":
+            self.executor = ProcessPoolExecutor(max_workers=workers)
+        else:
+            raise ValueError(f"Unknown executor {executor}")
+        self.workers = workers
+        self.max_queue = max_queue
+        self.pending = 0
+
+    def is_full(self):
+        if self.max_queue is None:
+            return False
+        return self.pending >= self.workers + self.max_queue
+
+    @contextmanager
+    def reserve(self):
+        """Count a request as pending until it has been composed."""
+        self.pending += 1
+        try:
+            yield
+        finally:
+            self.pending -= 1
+
+    @contextmanager
+    def try_reserve(self):
+        """Like reserve, but yields False without counting the request if the
+        pool is full.
+
+        Checking and counting happen in one step, so that concurrent requests
+        cannot exceed the limit.
+        """
+        if self.is_full():
+            yield False
+            return
+        with self.reserve():
+            yield True
+
+    async def run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    async def load_template(self, data):
+        """Load a master template for being used by multiple compositions."""
+        if isinstance(self.executor, ProcessPoolExecutor):
+            # Parsed documents cannot be passed to other processes, thus
+            # templates are kept as bytes.
+            return data
+        return await self.run(load_template, data)
+
+    async def compose(self, documents, options, template=None):
+        """Compose the given documents and yield the composed document in
+        chunks.
+
+        The chunks are produced in the stream pool, so that streaming a
+        response does not wait for other compositions queued in the pool.
+        """
+        if isinstance(self.executor, ProcessPoolExecutor):
+            # Files cannot be passed to other processes, thus the documents
+            # are passed as bytes.
+            documents = [document.read() for document in documents]
+            if template is not None:
+                documents.insert(0, template)
+            yield await self.run(compose_documents_to_bytes, documents, options)
+            return
+
+        composer = await self.run(compose_documents, documents, options, template)
+        chunks = iterate_in_executor(composer.stream(CHUNK_SIZE), self.streams)
+        async with aclosing(chunks):
+            async for chunk in chunks:
+                yield chunk
+
+    async def compose_to_file(
+        self, documents, output, options, template=None, progress=None
+    ):
+        """Compose the given documents into the given output file."""
+        if isinstance(self.executor, ProcessPoolExecutor):
+            # Parsed templates and progress callbacks cannot be passed to
+            # other processes.
+            if template is not None:
+                documents = [BytesIO(template)] + documents
+            await self.run(compose_documents_to_file, documents, output, options)
+        else:
+            await self.run(
+                compose_documents_to_file,
+                documents,
+                output,
+                options,
+                template,
+                progress,
+            )
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        if self.streams is not None:
+            self.streams.shutdown(wait=True, cancel_futures=True)
+
+
+async def iterate_in_executor(iterator, executor, queue_size=STREAM_QUEUE_SIZE):
+    """Consume the given iterator in a single task of the given executor and
+    yield its items.
+
+    At most `queue_size` items are produced ahead of the consumer. When the
+    consumer stops early, the task stops after the item being produced.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(queue_size)
+    closed = threading.Event()
+    done = object()
+
+    def put(item, error=None):
+        asyncio.run_coroutine_threadsafe(queue.put((item, error)), loop).result()
+
+    def produce():
+        if closed.is_set():
+            return
+        try:
+            for item in iterator:
+                put(item)
+                if closed.is_set():
+                    return
+        except BaseException as error:
+            put(done, error)
+        else:
+            put(done)
+
+    loop.run_in_executor(executor, produce)
+    try:
+        while True:
+            item, error = await queue.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        closed.set()
+        # Unblock the producer waiting for room in the queue
+        while not queue.empty():
+            queue.get_nowait()
+
+
+class TemplateCache(object):
+    """Cache of master templates by their content hash.
+
+    The least recently used templates are evicted once the total size of the
+    cached templates exceeds `max_size` bytes.
+    """
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.size = 0
+        self._templates = OrderedDict()
+
+    def add(self, template_hash, template, size):
+        """Add a template with its size in bytes."""
+        if template_hash in self._templates:
+            self._templates.move_to_end(template_hash)
+            return
+
+        self._templates[template_hash] = (template, size)
+        self.size += size
+        while self.size > self.max_size:
+            evicted_hash, (evicted, evicted_size) = self._templates.popitem(last=False)
+            self.size -= evicted_size
+            logger.info("Evicted template %s from cache.", evicted_hash)
+
+    def get(self, template_hash):
+        """The template with the given hash or None."""
+        if template_hash not in self._templates:
+            return None
+        self._templates.move_to_end(template_hash)
+        return self._templates[template_hash][0]
+
+    def __contains__(self, template_hash):
+        return template_hash in self._templates
+
+
+class Job(object):
+    """A composition running in the background.
+
+    The status of the job is stored in its directory, so that it is
+    available to all server processes.
+    """
+
+    def __init__(self, job_id, directory, status="pending", composed=0, total=0):
+        self.id = job_id
+        self.directory = directory
+        self.status = status
+        self.composed = composed
+        self.total = total
+        self.finished = None
+        self.updated = None
+
+    @classmethod
+    def load(cls, directory):
+        """Load the job stored in the given directory or return None."""
+        try:
+            with open(os.path.join(directory, "status.json")) as file_:
+                data = json.load(file_)
+        except (OSError, ValueError):
+            return None
+        job = cls(
+            data["job"],
+            directory,
+            status=data["status"],
+            composed=data["composed"],
+            total=data["total"],
+        )
+        job.finished = data["finished"]
+        job.updated = data["updated"]
+        return job
+
+    @property
+    def result_path(self):
+        return os.path.join(self.directory, "composed.docx")
+
+    def save(self):
+        self.updated = time.time()
+        data = self.as_dict()
+        data["finished"] = self.finished
+        data["updated"] = self.updated
+        filename = os.path.join(self.directory, "status.json")
+        with open(filename + ".tmp", "w") as file_:
+            json.dump(data, file_)
+        os.replace(filename + ".tmp", filename)
+
+    def update(self, composed):
+        self.composed = composed
+        self.save()
+
+    def finish(self, status):
+        self.status = status
+        self.finished = time.time()
+        self.save()
+
+    def is_expired(self, ttl):
+        """Whether the job has finished more than `ttl` seconds ago, or has
+        not been updated for `ttl` seconds, e.g. because the process running
+        it has been killed.
+        """
+        if self.finished is not None:
+            return self.finished < time.time() - ttl
+        return self.updated < time.time() - ttl
+
+    def as_dict(self):
+        return {
+            "job": self.id,
+            "status": self.status,
+            "composed": self.composed,
+            "total": self.total,
+        }
+
+
+class JobStore(object):
+    """Jobs with their documents stored in a directory on disk.
+
+    Finished jobs and their results are removed after `ttl` seconds, as are
+    unfinished jobs which have not been updated for `ttl` seconds.
+    """
+
+    def __init__(self, directory, ttl):
+        self.directory = directory
+        self.ttl = ttl
+        # Tasks of the jobs running in this process
+        self._tasks = {}
+
+    def create(self):
+        job_id = uuid.uuid4().hex
+        directory = os.path.join(self.directory, job_id)
+        os.makedirs(directory)
+        job = Job(job_id, directory)
+        job.save()
+        return job
+
+    def start(self, job, coro):
+        task = self._tasks[job.id] = asyncio.ensure_future(coro)
+        task.add_done_callback(lambda task: self._tasks.pop(job.id, None))
+
+    def get(self, job_id):
+        """The job with the given id or None."""
+        if not JOB_ID_RE.fullmatch(job_id):
+            return None
+        job = Job.load(os.path.join(self.directory, job_id))
+        # Jobs running in this process are still updated
+        if job is not None and job.id not in self._tasks and job.is_expired(self.ttl):
+            self.remove(job)
+            return None
+        return job
+
+    def remove(self, job):
+        task = self._tasks.pop(job.id, None)
+        if task is not None:
+            task.cancel()
+        shutil.rmtree(job.directory, ignore_errors=True)
+
+    def expire(self):
+        """Remove expired jobs."""
+        for job_id in os.listdir(self.directory):
+            self.get(job_id)
+
+    async def wait(self):
+        """Wait for the jobs running in this process."""
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+
+class Recycler(object):
+    """Shuts the server process down gracefully after a number of requests
+    or once its memory usage exceeds `max_memory` bytes, so that it is
+    replaced by a new worker process.
+    """
+
+    def __init__(self, max_requests=None, max_memory=None):
+        self.max_requests = max_requests
+        self.max_memory = max_memory
+        self.requests = 0
+        self.recycling = False
+
+    def is_exhausted(self):
+        if self.max_requests is not None and self.requests >= self.max_requests:
+            return True
+        if self.max_memory is not None and memory_usage() > self.max_memory:
+            return True
+        return False
+
+    @web.middleware
+    async def middleware(self, request, handler):
+        try:
+            return await handler(request)
+        finally:
+            self.requests += 1
+            if not self.recycling and self.is_exhausted():
+                self.recycling = True
+                logger.info(
+                    "Recycling worker %s after %s requests.",
+                    os.getpid(),
+                    self.requests,
+                )
+                asyncio.get_running_loop().call_soon(
+                    os.kill, os.getpid(), signal.SIGTERM
+                )
+
+
+compose_pool_key = web.AppKey("compose_pool", ComposePool)
+job_store_key = web.AppKey("job_store", JobStore)
+spool_size_key = web.AppKey("spool_size", int)
+template_cache_key = web.AppKey("template_cache", TemplateCache)
+recycler_key = web.AppKey("recycler", Recycler)
+jobs_dir_key = web.AppKey("jobs_dir", str)
+templates_dir_key = web.AppKey("templates_dir", str)
+job_ttl_key = web.AppKey("job_ttl", int)
+
+
 async def compose(request):
 
     documents = []
@@ -29,9 +430,23 @@ async def compose(request):
         )
         return web.Response(status=400, text="Multipart request required")
 
-    reader = await request.multipart()
-
-    with tempfile.TemporaryDirectory() as temp_dir:
+    pool = request.app[compose_pool_key]
+    # Documents are kept in memory and only written to temporary files if
+    # they are larger than the spool size.
+    with pool.try_reserve() as reserved, ExitStack() as uploads:
+        if not reserved:
+            logger.warning("Server busy. %s compositions pending.", pool.pending)
+            return web.Response(status=503, text="Server busy")
+
+        template = None
+        template_hash = request.rel_url.query.get("template")
+        if template_hash:
+            template = await get_template(request.app, template_hash)
+            if template is None:
+                return web.Response(status=404, text="Unknown template")
+
+        reader = await request.multipart()
+        spool_size = request.app[spool_size_key]
         while True:
             part = await reader.next()
 
@@ -41,27 +456,72 @@ async def compose(request):
             if part.filename is None:
                 continue
 
-            documents.append(await save_part_to_file(part, temp_dir))
+            document = uploads.enter_context(SpooledTemporaryFile(max_size=spool_size))
+            await save_part_to_file(part, document)
+            document.seek(0)
+            documents.append(document)
 
-        if not documents:
+        if not documents and template is None:
             return web.Response(status=400, text="No documents provided")
 
-        composed_filename = os.path.join(temp_dir, "composed.docx")
-
+        chunks = pool.compose(documents, compose_options(request), template)
         try:
-            composer = Composer(Document(documents.pop(0)), **compose_options(request))
-            for document in documents:
-                composer.append(Document(document))
-            composer.save(composed_filename)
+            # The documents are composed when the first chunk is requested
+            first_chunk = await anext(chunks)
         except Exception:
             logger.exception("Failed composing documents.")
             return web.Response(status=500, text="Failed composing documents")
+        uploads.close()
 
-        return await stream_file(
-            request,
-            composed_filename,
-            "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        )
+        async with aclosing(chunks):
+            return await stream_chunks(
+                request,
+                first_chunk,
+                chunks,
+                "composed.docx",
+                "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+            )
+
+
+def compose_documents(documents, options, template=None, progress=None):
+    """Compose the given documents, given as paths or file-like objects.
+    Without template, the first document is used as master. The optional
+    progress callback is called with the number of documents composed,
+    including the master.
+    """
+    if template is None:
+        master = Document(documents[0])
+        documents = documents[1:]
+    else:
+        master = template.clone()
+    composer = Composer(master, deferred_renumbering=True, **options)
+    if progress is not None:
+        progress(1)
+    for index, document in enumerate(documents, 1):
+        composer.append(Document(document))
+        if progress is not None:
+            progress(index + 1)
+    return composer
+
+
+def compose_documents_to_file(documents, output, options, template=None, progress=None):
+    composer = compose_documents(documents, options, template, progress)
+    composer.save(output)
+
+
+def load_template(data):
+    return DocumentSnapshot(Document(BytesIO(data)))
+
+
+def template_size(data):
+    """The uncompressed size of a template."""
+    with ZipFile(BytesIO(data)) as zip_file:
+        return sum(info.file_size for info in zip_file.infolist())
+
+
+def compose_documents_to_bytes(documents, options):
+    composer = compose_documents([BytesIO(document) for document in documents], options)
+    return b"".join(composer.stream(CHUNK_SIZE))
 
 
 def compose_options(request):
@@ -70,57 +530,357 @@ def compose_options(request):
     }
 
 
-async def save_part_to_file(part, directory):
-    filename = os.path.join(directory, f"{part.name}_{part.filename}")
-    with open(filename, "wb") as file_:
-        while True:
-            chunk = await part.read_chunk(CHUNK_SIZE)
-            if not chunk:
-                break
-            file_.write(chunk)
-    return filename
+async def save_part_to_file(part, file_):
+    while True:
+        chunk = await part.read_chunk(CHUNK_SIZE)
+        if not chunk:
+            break
+        file_.write(chunk)
 
 
-async def stream_file(request, filename, content_type):
+async def stream_chunks(request, first_chunk, chunks, filename, content_type):
     response = web.StreamResponse(
         status=200,
         reason="OK",
         headers={
             "Content-Type": content_type,
-            "Content-Disposition": f'attachment; filename="{os.path.basename(filename)}"',  # noqa
+            "Content-Disposition": f'attachment; filename="{filename}"',
         },
     )
     await response.prepare(request)
 
-    with open(filename, "rb") as outfile:
-        while True:
-            data = outfile.read(CHUNK_SIZE)
-            if not data:
-                break
-            await response.write(data)
+    await response.write(first_chunk)
+    async for chunk in chunks:
+        await response.write(chunk)
 
     await response.write_eof()
     return response
 
 
+async def add_template(request):
+    if not request.content_type == "multipart/form-data":
+        return web.Response(status=400, text="Multipart request required")
+
+    data = None
+    reader = await request.multipart()
+    while True:
+        part = await reader.next()
+
+        if part is None:
+            break
+
+        if part.filename is None:
+            continue
+
+        data = await part.read()
+        break
+
+    if data is None:
+        return web.Response(status=400, text="No template provided")
+
+    cache = request.app[template_cache_key]
+    template_hash = hashlib.sha256(data).hexdigest()
+    if template_hash in cache:
+        # Mark the template as recently used
+        cache.get(template_hash)
+        return web.json_response({"template": template_hash}, status=201)
+
+    try:
+        size = template_size(data)
+    except BadZipFile:
+        return web.Response(status=400, text="Invalid template")
+    if size > cache.max_size:
+        return web.Response(status=413, text="Template too large")
+
+    pool = request.app[compose_pool_key]
+    with pool.reserve():
+        try:
+            template = await pool.load_template(data)
+        except Exception:
+            logger.exception("Failed loading template.")
+            return web.Response(status=400, text="Invalid template")
+
+    cache.add(template_hash, template, size)
+    if request.app[templates_dir_key] is not None:
+        save_template(request.app[templates_dir_key], template_hash, data)
+    return web.json_response({"template": template_hash}, status=201)
+
+
+async def has_template(request):
+    template_hash = request.match_info["template"]
+    if template_hash not in request.app[template_cache_key]:
+        path = template_path(request.app[templates_dir_key], template_hash)
+        if path is None or not os.path.exists(path):
+            return web.Response(status=404, text="Unknown template")
+    return web.Response(status=200, text="OK")
+
+
+async def get_template(app, template_hash):
+    """The template with the given hash or None.
+
+    Templates shared by other processes through the templates directory are
+    loaded into the cache of this process when they are used first.
+    """
+    cache = app[template_cache_key]
+    template = cache.get(template_hash)
+    if template is not None:
+        return template
+
+    path = template_path(app[templates_dir_key], template_hash)
+    if path is None:
+        return None
+    try:
+        with open(path, "rb") as file_:
+            data = file_.read()
+    except FileNotFoundError:
+        return None
+    template = await app[compose_pool_key].load_template(data)
+    cache.add(template_hash, template, template_size(data))
+    return template
+
+
+def template_path(directory, template_hash):
+    """The path of a shared template or None if templates are not shared."""
+    if directory is None or not TEMPLATE_HASH_RE.fullmatch(template_hash):
+        return None
+    return os.path.join(directory, f"{template_hash}.docx")
+
+
+def save_template(directory, template_hash, data):
+    """Save a template for being used by other processes."""
+    path = template_path(directory, template_hash)
+    if os.path.exists(path):
+        return
+    # Other processes must never read a partially written template
+    temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(temp_path, "wb") as file_:
+        file_.write(data)
+    os.replace(temp_path, path)
+
+
+async def submit_job(request):
+    if not request.content_type == "multipart/form-data":
+        return web.Response(status=400, text="Multipart request required")
+
+    pool = request.app[compose_pool_key]
+    with ExitStack() as reservation:
+        if not reservation.enter_context(pool.try_reserve()):
+            logger.warning("Server busy. %s compositions pending.", pool.pending)
+            return web.Response(status=503, text="Server busy")
+
+        template = None
+        template_hash = request.rel_url.query.get("template")
+        if template_hash:
+            template = await get_template(request.app, template_hash)
+            if template is None:
+                return web.Response(status=404, text="Unknown template")
+
+        store = request.app[job_store_key]
+        job = store.create()
+        documents = []
+        reader = await request.multipart()
+        try:
+            while True:
+                part = await reader.next()
+
+                if part is None:
+                    break
+
+                if part.filename is None:
+                    continue
+
+                filename = os.path.join(job.directory, f"{len(documents)}.docx")
+                with open(filename, "wb") as file_:
+                    await save_part_to_file(part, file_)
+                documents.append(filename)
+        except BaseException:
+            store.remove(job)
+            raise
+
+        if not documents and template is None:
+            store.remove(job)
+            return web.Response(status=400, text="No documents provided")
+
+        # The template or the first document is the master
+        job.total = len(documents) if template is None else len(documents) + 1
+        job.save()
+        # The job stays counted as pending until it has been composed
+        reserved = reservation.pop_all()
+        store.start(
+            job,
+            run_job(
+                request.app,
+                job,
+                documents,
+                compose_options(request),
+                template,
+                reserved,
+            ),
+        )
+        return web.json_response(
+            job.as_dict(), status=202, headers={"Location": f"/jobs/{job.id}"}
+        )
+
+
+async def run_job(app, job, documents, options, template, reservation):
+    pool = app[compose_pool_key]
+    with reservation:
+        try:
+            await pool.compose_to_file(
+                documents, job.result_path, options, template, job.update
+            )
+        except Exception:
+            logger.exception("Failed composing documents of job %s.", job.id)
+            job.finish("failed")
+        else:
+            job.update(job.total)
+            job.finish("done")
+
+
+async def job_status(request):
+    job = request.app[job_store_key].get(request.match_info["job"])
+    if job is None:
+        return web.Response(status=404, text="Unknown job")
+    return web.json_response(job.as_dict())
+
+
+async def job_result(request):
+    job = request.app[job_store_key].get(request.match_info["job"])
+    if job is None:
+        return web.Response(status=404, text="Unknown job")
+    if job.status == "failed":
+        return web.Response(status=500, text="Failed composing documents")
+    if job.status != "done":
+        return web.Response(status=409, text="Job not finished")
+    return web.FileResponse(
+        job.result_path,
+        headers={
+            "Content-Type": (
+                "application/vnd.openxmlformats-officedocument"
+                ".wordprocessingml.document"
+            ),
+            "Content-Disposition": 'attachment; filename="composed.docx"',
+        },
+    )
+
+
+async def job_store_context(app):
+    """Provide the job store and expire finished jobs periodically."""
+    jobs_dir = app[jobs_dir_key]
+    temp_dir = None
+    if jobs_dir is None:
+        temp_dir = jobs_dir = mkdtemp(prefix="docxcompose-jobs-")
+    store = app[job_store_key] = JobStore(jobs_dir, app[job_ttl_key])
+
+    async def expire():
+        while True:
+            await asyncio.sleep(JOB_EXPIRY_INTERVAL)
+            store.expire()
+
+    task = asyncio.ensure_future(expire())
+    yield
+    task.cancel()
+    await store.wait()
+    if temp_dir is not None:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
 async def healthcheck(request):
     return web.Response(status=200, text="OK")
 
 
-def create_app():
+def create_app(
+    executor="thread",
+    workers=None,
+    max_queue=None,
+    spool_size=None,
+    template_cache_size=None,
+    jobs_dir=None,
+    job_ttl=None,
+    max_requests=None,
+    max_memory=None,
+    templates_dir=None,
+):
     app = web.Application()
+    if max_requests is not None or max_memory is not None:
+        app[recycler_key] = Recycler(max_requests, max_memory)
+        app.middlewares.append(app[recycler_key].middleware)
+    app[jobs_dir_key] = jobs_dir
+    app[templates_dir_key] = templates_dir
+    app[job_ttl_key] = JOB_TTL if job_ttl is None else job_ttl
+    app.cleanup_ctx.append(job_store_context)
+    app[spool_size_key] = SPOOL_SIZE if spool_size is None else spool_size
+    app[template_cache_key] = TemplateCache(
+        TEMPLATE_CACHE_SIZE if template_cache_size is None else template_cache_size
+    )
+    app[compose_pool_key] = ComposePool(executor, workers, max_queue)
+    app.on_cleanup.append(shutdown_compose_pool)
     app.add_routes([web.post("/", compose)])
+    app.add_routes([web.post("/templates", add_template)])
+    app.add_routes([web.get("/templates/{template}", has_template)])
+    app.add_routes([web.post("/jobs", submit_job)])
+    app.add_routes([web.get("/jobs/{job}", job_status)])
+    app.add_routes([web.get("/jobs/{job}/result", job_result)])
     app.add_routes([web.get("/healthcheck", healthcheck)])
     return app
 
 
+async def shutdown_compose_pool(app):
+    app[compose_pool_key].shutdown()
+
+
+def int_from_env(name):
+    value = os.environ.get(name, "")
+    return int(value) if value else None
+
+
 def main():
     print(f"docxcompose {version}")
     logging.basicConfig(
         format="%(asctime)s %(levelname)s %(name)s %(message)s",
         level=logging.INFO,
     )
-    web.run_app(create_app())
+    options = {
+        "executor": os.environ.get("DOCXCOMPOSE_EXECUTOR", "thread"),
+        "workers": int_from_env("DOCXCOMPOSE_WORKERS"),
+        "max_queue": int_from_env("DOCXCOMPOSE_MAX_QUEUE"),
+        "spool_size": int_from_env("DOCXCOMPOSE_SPOOL_SIZE"),
+        "template_cache_size": int_from_env("DOCXCOMPOSE_TEMPLATE_CACHE_SIZE"),
+        "jobs_dir": os.environ.get("DOCXCOMPOSE_JOBS_DIR") or None,
+        "job_ttl": int_from_env("DOCXCOMPOSE_JOB_TTL"),
+    }
+    processes = int_from_env("DOCXCOMPOSE_PROCESSES") or 1
+    if processes == 1:
+        web.run_app(create_app(**options), host=HOST, port=PORT)
+        return
+
+    options["max_requests"] = int_from_env("DOCXCOMPOSE_MAX_REQUESTS")
+    options["max_memory"] = int_from_env("DOCXCOMPOSE_MAX_MEMORY")
+    run_processes(processes, options)
+
+
+def run_processes(processes, options):
+    """Run the server in multiple processes sharing the listening socket."""
+    temp_dirs = []
+    if options["jobs_dir"] is None:
+        # Jobs are shared by all processes
+        options["jobs_dir"] = mkdtemp(prefix="docxcompose-jobs-")
+        temp_dirs.append(options["jobs_dir"])
+    # Uploaded templates are shared by all processes, each of which loads
+    # them into its own cache
+    options["templates_dir"] = mkdtemp(prefix="docxcompose-templates-")
+    temp_dirs.append(options["templates_dir"])
+
+    def worker(sock):
+        web.run_app(create_app(**options), sock=sock)
+
+    sock = bind_socket(HOST, PORT)
+    try:
+        Supervisor(worker, processes).run(sock)
+    finally:
+        sock.close()
+        for temp_dir in temp_dirs:
+            shutil.rmtree(temp_dir, ignore_errors=True)
 
 
 if __name__ == "__main__":
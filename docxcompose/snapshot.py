@@ -0,0 +1,64 @@
+from copy import deepcopy
+
+from docx.opc.part import XmlPart
+
+
+# Attributes set by the constructors of python-docx parts. Other attributes
+# are cached values referring to the original package and are not copied.
+PART_ATTRIBUTES = ("_partname", "_content_type", "_blob", "_image")
+
+
+class DocumentSnapshot(object):
+    """A parsed document from which independent copies can be created much
+    faster than by loading the document again.
+
+    The snapshot keeps a pristine copy of the package, thus changes to the
+    given document or to the copies do not affect it.
+    """
+
+    def __init__(self, doc):
+        self._package = clone_package(doc.part.package)
+
+    def clone(self):
+        """Return a new document which is a copy of the snapshot."""
+        return clone_package(self._package).main_document_part.document
+
+
+def clone_package(package):
+    """Return a copy of the given package.
+
+    The xml of the parts is copied, while the blobs of binary parts, e.g.
+    images, are immutable and thus shared with the copy.
+    """
+    clone = type(package)()
+    parts = {}
+    for part in package.iter_parts():
+        parts[part] = clone_part(part, clone)
+
+    sources = [(package, clone)]
+    sources.extend(parts.items())
+    for source, source_clone in sources:
+        for rel in source.rels.values():
+            target = rel.target_ref if rel.is_external else parts[rel.target_part]
+            source_clone.load_rel(rel.reltype, target, rel.rId, rel.is_external)
+
+    clone.after_unmarshal()
+    for part in parts.values():
+        part.after_unmarshal()
+    return clone
+
+
+def clone_part(part, package):
+    """Return a copy of the given part belonging to the given package.
+
+    The constructors of the part classes differ, thus the copy is created
+    without calling them.
+    """
+    clone = object.__new__(type(part))
+    for name in PART_ATTRIBUTES:
+        if name in part.__dict__:
+            clone.__dict__[name] = part.__dict__[name]
+    clone._package = package
+    if isinstance(part, XmlPart):
+        clone._element = deepcopy(part._element)
+    return clone
@@ -0,0 +1,61 @@
+import functools
+import threading
+from time import perf_counter
+
+
+class ComposerStats(object):
+    """Cumulative wall time and number of calls of the stages of a composer.
+
+    The time of a stage includes the time of the stages called by it, e.g.
+    `insert` includes `add_styles`. An optional callback is called with the
+    name and duration in seconds of every finished stage.
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.calls = {}
+        self.seconds = {}
+        # Documents may be prepared in other threads, see append_many
+        self._lock = threading.Lock()
+
+    def add(self, stage, duration):
+        with self._lock:
+            self.calls[stage] = self.calls.get(stage, 0) + 1
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + duration
+        if self.callback is not None:
+            self.callback(stage, duration)
+
+    def as_dict(self):
+        return {
+            stage: {"calls": self.calls[stage], "seconds": self.seconds[stage]}
+            for stage in self.calls
+        }
+
+    def report(self):
+        """The stages ordered by their time as text table."""
+        lines = ["%-40s %8s %10s" % ("stage", "calls", "seconds")]
+        for stage in sorted(self.seconds, key=self.seconds.get, reverse=True):
+            lines.append(
+                "%-40s %8d %10.3f" % (stage, self.calls[stage], self.seconds[stage])
+            )
+        return "\n".join(lines)
+
+
+def stage(func):
+    """Record the time of the decorated composer method if the composer has
+    stats enabled.
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        stats = self.stats
+        if stats is None:
+            return func(self, *args, **kwargs)
+        start = perf_counter()
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            stats.add(name, perf_counter() - start)
+
+    return wrapper
@@ -0,0 +1,80 @@
+import time
+from zipfile import ZIP_DEFLATED
+from zipfile import ZipFile
+from zipfile import ZipInfo
+
+from docx.opc.packuri import CONTENT_TYPES_URI
+from docx.opc.packuri import PACKAGE_URI
+from docx.opc.pkgwriter import _ContentTypesItem
+
+
+CHUNK_SIZE = 65536
+
+
+class ChunkBuffer(object):
+    """Write-only file-like object collecting the data written to it until it
+    is taken out in chunks.
+    """
+
+    def __init__(self):
+        self._data = []
+        self.size = 0
+
+    def write(self, data):
+        self._data.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b"".join(self._data)
+        self._data = []
+        self.size = 0
+        return data
+
+
+def iter_package(package, chunk_size=CHUNK_SIZE):
+    """Serialize the given package as zip file and yield it as chunks of
+    bytes.
+
+    The zip entries are written one after another, thus the first chunks are
+    available before all parts have been serialized and only one serialized
+    part is held in memory at a time.
+    """
+    parts = list(package.iter_parts())
+    for part in parts:
+        part.before_marshal()
+
+    buffer = ChunkBuffer()
+    # The buffer is not seekable, thus the zip file is written with data
+    # descriptors following the entries.
+    with ZipFile(buffer, "w", compression=ZIP_DEFLATED) as zipf:
+        for pack_uri, blob in _iter_members(package, parts):
+            with zipf.open(_zip_info(pack_uri, blob), "w") as member:
+                for start in range(0, len(blob), chunk_size):
+                    member.write(blob[start : start + chunk_size])
+                    if buffer.size >= chunk_size:
+                        yield buffer.take()
+    data = buffer.take()
+    if data:
+        yield data
+
+
+def _iter_members(package, parts):
+    yield CONTENT_TYPES_URI, _ContentTypesItem.from_parts(parts).blob
+    yield PACKAGE_URI.rels_uri, package.rels.xml
+    for part in parts:
+        yield part.partname, part.blob
+        if len(part.rels):
+            yield part.partname.rels_uri, part.rels.xml
+
+
+def _zip_info(pack_uri, blob):
+    # Same as ZipFile.writestr, which is used by python-docx
+    zinfo = ZipInfo(pack_uri.membername, date_time=time.localtime(time.time())[:6])
+    zinfo.compress_type = ZIP_DEFLATED
+    zinfo.external_attr = 0o600 << 16
+    zinfo.file_size = len(blob)
+    return zinfo
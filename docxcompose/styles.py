@@ -0,0 +1,51 @@
+from docx.styles import BabelFish
+
+
+class StyleRegistry(object):
+    """Registry of the styles in a styles part.
+
+    Provides the style ids, the mapping between style ids and (UI) names and
+    the style elements by id without creating python-docx style objects. The
+    styles part is scanned once, thus new styles have to be appended through
+    the registry to keep it up to date.
+    """
+
+    def __init__(self, element, preserved=None):
+        self.element = element
+        self.ids = set()
+        self.id2name = {}
+        self.name2id = {}
+        self._elements = {}
+        # Ids of the preserved variants of a style, see Composer.add_styles
+        self.preserved = {} if preserved is None else preserved
+
+        for style in element.style_lst:
+            self._add(style)
+        self._length = len(element)
+
+    def _add(self, style):
+        style_id = style.styleId
+        name = style.name_val
+        if name is not None:
+            name = BabelFish.internal2ui(name)
+        self.ids.add(style_id)
+        self.id2name[style_id] = name
+        self.name2id[name] = style_id
+        if style_id is not None:
+            self._elements.setdefault(style_id, style)
+
+    def get_by_id(self, style_id):
+        """The style element with the given id or None."""
+        return self._elements.get(style_id)
+
+    def append(self, style):
+        """Append a style element to the styles part."""
+        self.element.append(style)
+        self._add(style)
+        self._length += 1
+
+    def is_outdated(self, element):
+        """Whether the given styles element has been replaced or changed
+        since the registry was built.
+        """
+        return element is not self.element or len(element) != self._length
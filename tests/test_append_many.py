@@ -0,0 +1,87 @@
+import random
+
+from docx import Document
+from utils import ComparableDocument
+from utils import docx_path
+
+from docxcompose.composer import Composer
+
+
+FILENAMES = [
+    "numberings.docx",
+    "images.docx",
+    "footnote.docx",
+    "docproperties.docx",
+    "styles_en.docx",
+    "embedded_excel_chart.docx",
+]
+
+
+def compose_sequentially(filenames, **kwargs):
+    random.seed(1)
+    composer = Composer(Document(docx_path("master.docx")), **kwargs)
+    for filename in filenames:
+        composer.append(Document(docx_path(filename)))
+    return ComparableDocument(composer.doc)
+
+
+def compose_many(filenames, workers, **kwargs):
+    random.seed(1)
+    composer = Composer(Document(docx_path("master.docx")), **kwargs)
+    composer.append_many([docx_path(filename) for filename in filenames], workers)
+    return ComparableDocument(composer.doc)
+
+
+def test_append_many_equals_sequential_append():
+    expected = compose_sequentially(FILENAMES)
+
+    assert compose_many(FILENAMES, workers=1) == expected
+    assert compose_many(FILENAMES, workers=4) == expected
+
+
+def test_append_many_with_preserved_styles_equals_sequential_append():
+    expected = compose_sequentially(FILENAMES, preserve_styles=True)
+
+    assert compose_many(FILENAMES, workers=4, preserve_styles=True) == expected
+
+
+def test_append_many_accepts_documents():
+    expected = compose_sequentially(FILENAMES)
+
+    random.seed(1)
+    composer = Composer(Document(docx_path("master.docx")))
+    composer.append_many(
+        [Document(docx_path(filename)) for filename in FILENAMES], workers=2
+    )
+
+    assert ComparableDocument(composer.doc) == expected
+
+
+def test_append_many_accepts_the_same_document_several_times():
+    random.seed(1)
+    expected = Composer(Document(docx_path("master.docx")))
+    doc = Document(docx_path("docproperties.docx"))
+    for _ in range(8):
+        expected.append(doc)
+
+    # Concurrent changes of the same document only fail sometimes
+    for _ in range(10):
+        random.seed(1)
+        composer = Composer(Document(docx_path("master.docx")))
+        doc = Document(docx_path("docproperties.docx"))
+        composer.append_many([doc] * 8, workers=8)
+
+        assert ComparableDocument(composer.doc) == ComparableDocument(expected.doc)
+
+
+def test_prepared_document_can_be_inserted_twice():
+    composer = Composer(Document(docx_path("master.docx")))
+    prepared = composer.prepare(docx_path("images.docx"))
+    composer.append(prepared)
+    composer.append(prepared)
+
+    expected = Composer(Document(docx_path("master.docx")))
+    expected.append(Document(docx_path("images.docx")))
+    expected.append(Document(docx_path("images.docx")))
+
+    assert ComparableDocument(composer.doc) == ComparableDocument(expected.doc)
@@ -21,3 +21,20 @@ def test_command_creates_composed_docx_file_at_output_path(tmpdir):
     assert output_path.exists()
     assert output_path.isfile()
     assert output_path.size() > 0
+
+
+def test_command_prints_stats(tmpdir, capsys):
+    output_path = tmpdir.join("outfile.docx")
+    arguments = [
+        docx_path("master.docx"),
+        docx_path("table.docx"),
+        "--output-document",
+        output_path.strpath,
+        "--stats",
+    ]
+    with pytest.raises(SystemExit):
+        command.main(arguments)
+
+    lines = capsys.readouterr().err.splitlines()
+    assert lines[0].split() == ["stage", "calls", "seconds"]
+    assert "insert" in [line.split()[0] for line in lines]
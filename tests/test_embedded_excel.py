@@ -1,9 +1,57 @@
+from copy import deepcopy
+
+from docx import Document
 from utils import ComposedDocument
+from utils import docx_path
 from utils import FixtureDocument
 
+from docxcompose.composer import Composer
+from docxcompose.utils import xpath
+
 
 def test_hyperlinks():
     doc = FixtureDocument("embedded_excel_chart.docx")
     composed = ComposedDocument("master.docx", "embedded_excel_chart.docx")
 
     assert composed == doc
+
+
+def test_part_referenced_several_times_is_copied_once():
+    doc = Document(docx_path("embedded_excel_chart.docx"))
+    chart = xpath(doc.element.body, ".//w:p[.//c:chart]")[0]
+    chart.addnext(deepcopy(chart))
+
+    composer = Composer(Document(docx_path("master.docx")))
+    composer.append(doc)
+
+    partnames = [p.partname for p in composer.pkg.iter_parts()]
+    assert partnames.count("/word/charts/chart1.xml") == 1
+    assert "/word/charts/chart2.xml" not in partnames
+    rids = xpath(composer.doc.element.body, ".//c:chart/@r:id")
+    assert len(rids) == 2
+    assert rids[0] == rids[1]
+
+
+def test_relationships_of_copied_part_keep_their_rids():
+    doc = Document(docx_path("embedded_excel_chart.docx"))
+    chart_part = [
+        part
+        for part in doc.part.package.iter_parts()
+        if part.partname == "/word/charts/chart1.xml"
+    ][0]
+    rel = chart_part.rels["rId1"]
+    chart_part.rels.add_relationship(rel.reltype, rel.target_part, "rId2")
+
+    composer = Composer(Document(docx_path("master.docx")))
+    composer.append(doc)
+
+    new_chart_part = [
+        part
+        for part in composer.pkg.iter_parts()
+        if part.partname == "/word/charts/chart1.xml"
+    ][0]
+    assert sorted(new_chart_part.rels) == ["rId1", "rId2"]
+    assert (
+        new_chart_part.rels["rId1"].target_part
+        is new_chart_part.rels["rId2"].target_part
+    )
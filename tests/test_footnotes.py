@@ -1,6 +1,13 @@
+from docx import Document
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.oxml import parse_xml
 from utils import ComposedDocument
+from utils import docx_path
 from utils import FixtureDocument
 
+from docxcompose.composer import Composer
+from docxcompose.utils import xpath
+
 
 def test_footnote():
     doc = FixtureDocument("footnote.docx")
@@ -14,3 +21,42 @@ def test_footnotes_with_hyperlinks():
     composed = ComposedDocument("master.docx", "footnotes_with_hyperlinks.docx")
 
     assert composed == doc
+
+
+def test_footnotes_are_kept_as_parsed_tree_between_inserts():
+    composer = Composer(Document(docx_path("master.docx")))
+    composer.append(Document(docx_path("footnote.docx")))
+    footnote_part = composer.footnote_part()
+    element = footnote_part.element
+
+    composer.append(Document(docx_path("footnote.docx")))
+
+    assert composer.footnote_part() is footnote_part
+    assert footnote_part.element is element
+    assert xpath(element, "./w:footnote/@w:id") == ["1", "2"]
+
+
+def test_hyperlinks_in_footnotes_reference_copied_relationships():
+    composer = Composer(Document(docx_path("master.docx")))
+    composer.append(Document(docx_path("aatmay.docx")))
+    footnote_part = composer.footnote_part()
+
+    rids = set(xpath(footnote_part.element, ".//w:hyperlink/@r:id"))
+    assert rids
+    assert rids <= set(footnote_part.rels)
+
+
+def test_source_footnotes_are_parsed_once_per_insert(monkeypatch):
+    doc = Document(docx_path("footnote.docx"))
+    blob = doc.part.rels.part_with_reltype(RT.FOOTNOTES).blob
+    parsed = []
+
+    def recording_parse_xml(xml):
+        parsed.append(xml)
+        return parse_xml(xml)
+
+    monkeypatch.setattr("docxcompose.composer.parse_xml", recording_parse_xml)
+    composer = Composer(Document(docx_path("master.docx")))
+    composer.append(doc)
+
+    assert parsed.count(blob) == 1
@@ -1,6 +1,14 @@
+from io import BytesIO
+
+from docx import Document
+from utils import ComparableDocument
 from utils import ComposedDocument
+from utils import docx_path
 from utils import FixtureDocument
 
+from docxcompose.composer import Composer
+from docxcompose.utils import xpath
+
 
 def test_images():
     doc = FixtureDocument("images.docx")
@@ -21,3 +29,55 @@ def test_renumbering_of_non_visual_properties():
     composed = ComposedDocument("header_with_image.docx", "image.docx")
 
     assert composed == expected
+
+
+def test_identical_images_are_added_once():
+    composer = Composer(Document(docx_path("master.docx")))
+    composer.append(Document(docx_path("images.docx")))
+    image_partnames = [p.partname for p in composer.pkg.image_parts]
+
+    composer.append(Document(docx_path("images.docx")))
+
+    assert [p.partname for p in composer.pkg.image_parts] == image_partnames
+
+
+def test_images_added_without_composer_are_not_overwritten():
+    composer = Composer(Document(docx_path("master.docx")))
+    composer.append(Document(docx_path("image.docx")))
+    composer.doc.add_picture(
+        BytesIO(composer.pkg.image_parts._image_parts[0].blob + b"\0")
+    )
+
+    composer.append(Document(docx_path("images.docx")))
+
+    partnames = [p.partname for p in composer.pkg.image_parts]
+    assert len(partnames) == len(set(partnames))
+
+
+def test_deferred_renumbering_of_non_visual_properties():
+    composer = Composer(
+        Document(docx_path("header_with_image.docx")), deferred_renumbering=True
+    )
+    composer.append(Document(docx_path("image.docx")))
+    doc_pr_ids = xpath(composer.doc.element.body, ".//wp:docPr/@id")
+    for part in composer.header_and_footer_parts():
+        doc_pr_ids.extend(xpath(part.element, ".//wp:docPr/@id"))
+    assert len(doc_pr_ids) != len(set(doc_pr_ids))
+
+    composer.finalize()
+
+    expected = FixtureDocument("renumbering_nv_props.docx")
+    assert ComparableDocument(composer.doc) == expected
+
+
+def test_save_runs_deferred_renumbering():
+    composer = Composer(
+        Document(docx_path("header_with_image.docx")), deferred_renumbering=True
+    )
+    composer.append(Document(docx_path("image.docx")))
+    stream = BytesIO()
+
+    composer.save(stream)
+
+    expected = FixtureDocument("renumbering_nv_props.docx")
+    assert ComparableDocument(Document(stream)) == expected
@@ -0,0 +1,70 @@
+import random
+
+from docx import Document
+from docx.opc.part import XmlPart
+from utils import ComparableDocument
+from utils import docx_path
+
+from docxcompose.composer import Composer
+from docxcompose.memory import RetainedMemory
+
+
+FILENAMES = [
+    "numberings.docx",
+    "images.docx",
+    "footnote.docx",
+    "docproperties.docx",
+    "smart_art.docx",
+    "embedded_excel_chart.docx",
+]
+
+
+def compose(filenames, **kwargs):
+    random.seed(1)
+    composer = Composer(Document(docx_path("master.docx")), **kwargs)
+    for filename in filenames:
+        composer.append(docx_path(filename))
+    return composer
+
+
+def test_low_memory_mode_composes_same_document(tmpdir):
+    expected = ComparableDocument(compose(FILENAMES).doc)
+    composer = compose(FILENAMES, low_memory=True)
+
+    assert ComparableDocument(composer.doc) == expected
+    # Parts shared with the inserted documents are kept
+    composer.save(tmpdir.join("composed.docx").strpath)
+
+
+def test_low_memory_mode_releases_loaded_documents():
+    composer = Composer(Document(docx_path("master.docx")), low_memory=True)
+    prepared = composer.prepare(docx_path("images.docx"))
+    parts = list(prepared.doc.part.package.iter_parts())
+    composer.append(prepared)
+
+    assert prepared.doc is None
+    for part in parts:
+        if isinstance(part, XmlPart):
+            assert part._element is None
+        else:
+            assert part._blob is None
+    assert composer._src_styles is None
+
+
+def test_low_memory_mode_keeps_given_documents_intact():
+    doc = Document(docx_path("images.docx"))
+    composer = Composer(Document(docx_path("master.docx")), low_memory=True)
+    composer.append(doc)
+
+    assert len(doc.paragraphs) > 0
+    assert len(doc.inline_shapes) > 0
+
+
+def test_low_memory_mode_retains_no_source():
+    memory = RetainedMemory()
+    compose(["images.docx"], memory=memory)
+    assert memory.source > 0
+
+    memory = RetainedMemory()
+    compose(["images.docx"], memory=memory, low_memory=True)
+    assert memory.source == 0
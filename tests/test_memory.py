@@ -0,0 +1,66 @@
+from docx import Document
+from utils import docx_path
+
+from docxcompose.composer import Composer
+from docxcompose.memory import package_size
+from docxcompose.memory import RetainedMemory
+from docxcompose.memory import xml_size
+
+
+def test_retained_memory_is_not_tracked_by_default():
+    composer = Composer(Document(docx_path("master.docx")))
+    composer.append(Document(docx_path("images.docx")))
+
+    assert composer.memory is None
+
+
+def test_retained_memory_is_updated_after_each_insert():
+    reports = []
+    memory = RetainedMemory(callback=lambda memory: reports.append(memory.as_dict()))
+    composer = Composer(Document(docx_path("master.docx")), memory=memory)
+    composer.append(Document(docx_path("images.docx")))
+    composer.append(Document(docx_path("table.docx")))
+
+    assert [report["documents"] for report in reports] == [1, 2]
+    assert reports[0]["blobs"] > 0
+    assert reports[1]["xml"] > reports[0]["xml"]
+    assert reports[1]["blobs"] == reports[0]["blobs"]
+    assert memory.source == sum(
+        package_size(Document(docx_path("table.docx")).part.package)
+    )
+    assert memory.total == memory.xml + memory.blobs + memory.source
+
+
+def test_retained_memory_counts_body_incrementally():
+    memory = RetainedMemory()
+    composer = Composer(Document(docx_path("master.docx")), memory=memory)
+    for _ in range(3):
+        composer.append(Document(docx_path("table.docx")))
+
+    xml, blobs = package_size(composer.doc.part.package)
+    assert memory.xml == xml
+    assert memory.blobs == blobs
+
+
+def test_retained_memory_measures_elements_of_other_parts_once(monkeypatch):
+    measured = []
+
+    def recording_xml_size(element):
+        measured.append(element)
+        return xml_size(element)
+
+    memory = RetainedMemory()
+    composer = Composer(Document(docx_path("master.docx")), memory=memory)
+    composer.append(Document(docx_path("footnote.docx")))
+    footnotes = composer.footnote_part().element
+    existing = list(footnotes)
+
+    monkeypatch.setattr("docxcompose.memory.xml_size", recording_xml_size)
+    composer.append(Document(docx_path("footnote.docx")))
+
+    xml, blobs = package_size(composer.doc.part.package)
+    assert memory.xml == xml
+    assert memory.blobs == blobs
+    added = [element for element in footnotes if element not in existing]
+    assert added
+    assert [element for element in measured if element in footnotes] == added
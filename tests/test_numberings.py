@@ -1,13 +1,27 @@
 import pytest
 from docx import Document
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls
+from docx.oxml.ns import qn
 from utils import ComposedDocument
 from utils import docx_path
 from utils import FixtureDocument
 
 from docxcompose.composer import Composer
+from docxcompose.numbering import NumberingIndex
 from docxcompose.utils import xpath
 
 
+NUMBERING_XML = """
+<w:numbering xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">
+  <w:abstractNum w:abstractNumId="0"/>
+  <w:abstractNum w:abstractNumId="3"/>
+  <w:num w:numId="1"><w:abstractNumId w:val="0"/></w:num>
+  <w:num w:numId="4"><w:abstractNumId w:val="3"/></w:num>
+</w:numbering>
+"""
+
+
 def test_abstractnums_from_styles_are_not_duplicated(multiple_numberings):
     anums = xpath(
         multiple_numberings.doc.part.numbering_part.element,
@@ -122,6 +136,75 @@ def test_preserves_list_styles_when_restarting_nested_numberings():
     assert composed == doc
 
 
+def test_numbering_index_provides_next_ids():
+    numbering = NumberingIndex(parse_xml(NUMBERING_XML))
+    assert numbering.next_num_id == 5
+    assert numbering.next_abstract_num_id == 4
+
+
+def test_numbering_index_provides_definitions_by_id():
+    numbering = NumberingIndex(parse_xml(NUMBERING_XML))
+    assert numbering.get_num("4").numId == 4
+    assert numbering.get_num(2) is None
+    assert numbering.get_abstract_num(3) is not None
+    assert numbering.abstract_num_id(1) == "0"
+    assert numbering.abstract_num_id(2) is None
+
+
+def test_numbering_index_inserts_definitions():
+    element = parse_xml(NUMBERING_XML)
+    numbering = NumberingIndex(element)
+    numbering.insert_abstract_num(
+        parse_xml('<w:abstractNum %s w:abstractNumId="4"/>' % nsdecls("w"))
+    )
+    numbering.insert_num(parse_xml('<w:num %s w:numId="5"/>' % nsdecls("w")))
+    numbering.insert_num(parse_xml('<w:num %s w:numId="6"/>' % nsdecls("w")))
+
+    ids = [el.get(qn("w:abstractNumId")) or el.get(qn("w:numId")) for el in element]
+    assert ids == ["0", "3", "4", "1", "5", "6", "4"]
+    assert numbering.next_num_id == 7
+    assert numbering.next_abstract_num_id == 5
+    assert numbering.get_num(6) is element[5]
+
+
+def test_numbering_index_inserts_into_empty_numbering():
+    element = parse_xml("<w:numbering %s/>" % nsdecls("w"))
+    numbering = NumberingIndex(element)
+    numbering.insert_num(parse_xml('<w:num %s w:numId="1"/>' % nsdecls("w")))
+    numbering.insert_abstract_num(
+        parse_xml('<w:abstractNum %s w:abstractNumId="0"/>' % nsdecls("w"))
+    )
+    numbering.insert_num(parse_xml('<w:num %s w:numId="2"/>' % nsdecls("w")))
+
+    assert [el.tag.split("}")[1] for el in element] == ["abstractNum", "num", "num"]
+    assert element[1].get(qn("w:numId")) == "2"
+
+
+def test_numbering_index_is_outdated_after_changes_without_index():
+    element = parse_xml(NUMBERING_XML)
+    numbering = NumberingIndex(element)
+    numbering.insert_num(parse_xml('<w:num %s w:numId="5"/>' % nsdecls("w")))
+    assert not numbering.is_outdated(element)
+
+    element.append(parse_xml('<w:num %s w:numId="6"/>' % nsdecls("w")))
+    assert numbering.is_outdated(element)
+    assert numbering.is_outdated(parse_xml(NUMBERING_XML))
+
+
+def test_composer_indexes_numberings_added_without_composer():
+    composer = Composer(Document(docx_path("numberings.docx")))
+    num_id = composer.numbering.next_num_id
+    composer.numbering_part().element.append(
+        parse_xml(
+            '<w:num %s w:numId="%d"><w:abstractNumId w:val="0"/></w:num>'
+            % (nsdecls("w"), num_id)
+        )
+    )
+
+    assert composer.numbering.next_num_id == num_id + 1
+    assert composer.numbering.get_num(num_id) is not None
+
+
 @pytest.fixture
 def numberings_with_zero_reference():
     composer = Composer(
@@ -0,0 +1,46 @@
+from docx import Document
+from docx.opc.packuri import PackURI
+from utils import docx_path
+
+from docxcompose.partnames import PartnameRegistry
+
+
+def test_next_partname_uses_next_free_number():
+    doc = Document(docx_path("embedded_excel_chart.docx"))
+    partnames = PartnameRegistry(doc.part.package)
+
+    assert partnames.next_partname(PackURI("/word/charts/chart1.xml")) == (
+        "/word/charts/chart2.xml"
+    )
+    assert partnames.next_partname(PackURI("/word/charts/chart1.xml")) == (
+        "/word/charts/chart3.xml"
+    )
+
+
+def test_next_partname_for_partname_without_number():
+    doc = Document(docx_path("embedded_excel_chart.docx"))
+    partnames = PartnameRegistry(doc.part.package)
+
+    assert partnames.next_partname(PackURI("/word/embeddings/package.bin")) == (
+        "/word/embeddings/package1.bin"
+    )
+
+
+def test_next_partname_skips_registered_partnames():
+    doc = Document(docx_path("embedded_excel_chart.docx"))
+    partnames = PartnameRegistry(doc.part.package)
+    partnames.add(PackURI("/word/charts/chart2.xml"))
+
+    assert partnames.next_partname(PackURI("/word/charts/chart1.xml")) == (
+        "/word/charts/chart3.xml"
+    )
+
+
+def test_next_partname_considers_partnames_with_same_prefix():
+    doc = Document(docx_path("embedded_excel_chart.docx"))
+    partnames = PartnameRegistry(doc.part.package)
+    partnames.add(PackURI("/customXml/itemProps1.xml"))
+
+    assert partnames.next_partname(PackURI("/customXml/item1.xml")) == (
+        "/customXml/item2.xml"
+    )
@@ -0,0 +1,58 @@
+import subprocess
+import sys
+import textwrap
+
+
+def test_supervisor_replaces_exited_workers(tmp_path):
+    pids = tmp_path / "pids"
+    script = textwrap.dedent(
+        """
+        import os
+        import signal
+        import sys
+
+        from docxcompose.prefork import bind_socket
+        from docxcompose.prefork import Supervisor
+
+        def worker(sock):
+            with open(sys.argv[1], "a") as pids:
+                pids.write("%s\\n" % os.getpid())
+            with open(sys.argv[1]) as pids:
+                if len(pids.readlines()) >= 4:
+                    os.kill(os.getppid(), signal.SIGTERM)
+
+        sock = bind_socket("127.0.0.1", 0)
+        Supervisor(worker, 2).run(sock)
+        """
+    )
+    subprocess.run([sys.executable, "-c", script, str(pids)], check=True, timeout=30)
+
+    assert len(set(pids.read_text().split())) >= 4
+
+
+def test_supervisor_does_not_start_workers_when_stopping(tmp_path):
+    pids = tmp_path / "pids"
+    script = textwrap.dedent(
+        """
+        import os
+        import subprocess
+        import sys
+        import time
+
+        from docxcompose.prefork import bind_socket
+        from docxcompose.prefork import Supervisor
+
+        def worker(sock):
+            with open(sys.argv[1], "a") as pids:
+                pids.write("%s\\n" % os.getpid())
+            # Stop the supervisor while it waits to replace the failed worker
+            subprocess.Popen(["sh", "-c", "sleep 0.3; kill -TERM %d" % os.getppid()])
+            raise ValueError("failed")
+
+        sock = bind_socket("127.0.0.1", 0)
+        Supervisor(worker, 1).run(sock)
+        """
+    )
+    subprocess.run([sys.executable, "-c", script, str(pids)], check=True, timeout=30)
+
+    assert len(pids.read_text().split()) == 1
@@ -16,6 +16,8 @@ from utils import simple_field_expression
 from docxcompose.properties import ComplexField
 from docxcompose.properties import CUSTOM_PROPERTY_TYPES
 from docxcompose.properties import CustomProperties
+from docxcompose.properties import InvalidComplexField
+from docxcompose.properties import scan_complex_fields
 from docxcompose.properties import SimpleField
 from docxcompose.properties import value2vt
 from docxcompose.properties import vt2value
@@ -704,6 +706,123 @@ class TestDissolveField(object):
         )
         assert paragraph.text == text.format(text="I was spellcecked", num=0)
 
+    @pytest.mark.parametrize(
+        "filename",
+        [
+            "docproperties.docx",
+            "three_props_in_same_paragraph.docx",
+            "docproperties_header_footer_3_sections.docx",
+            "outdated_docproperty_with_umlauts.docx",
+        ],
+    )
+    def test_dissolve_all_fields_equals_dissolving_each_property(self, filename):
+        expected = Document(docx_path(filename))
+        properties = CustomProperties(expected)
+        for name in properties.keys():
+            properties.dissolve_fields(name)
+
+        document = Document(docx_path(filename))
+        CustomProperties(document).dissolve_all_fields()
+
+        assert tostring(document.element) == tostring(expected.element)
+        for section, expected_section in zip(document.sections, expected.sections):
+            assert tostring(section.header._element) == tostring(
+                expected_section.header._element
+            )
+            assert tostring(section.footer._element) == tostring(
+                expected_section.footer._element
+            )
+
+    def test_finds_docprops_grouped_by_name(self):
+        document = Document(docx_path("three_props_in_same_paragraph.docx"))
+        docprops = CustomProperties(document).find_docprops_by_name()
+
+        assert {name: len(fields) for name, fields in docprops.items()} == {
+            "Text Property": 2,
+            "Number Property": 1,
+        }
+
+
+def field_paragraph(*runs):
+    """A paragraph with a run for each of the given fldChar types or texts."""
+    xml = []
+    for run in runs:
+        if run in ("begin", "separate", "end"):
+            xml.append('<w:r><w:fldChar w:fldCharType="{}"/></w:r>'.format(run))
+        elif run.startswith(" "):
+            xml.append(
+                '<w:r><w:instrText xml:space="preserve">{}</w:instrText></w:r>'.format(
+                    run
+                )
+            )
+        else:
+            xml.append("<w:r><w:t>{}</w:t></w:r>".format(run))
+    return parse_xml(
+        '<w:p xmlns:w="{}">{}</w:p>'.format(
+            "http://schemas.openxmlformats.org/wordprocessingml/2006/main",
+            "".join(xml),
+        )
+    )
+
+
+class TestScanComplexFields(object):
+    def test_finds_runs_of_nested_fields(self):
+        w_p = field_paragraph(
+            "begin",
+            ' DOCPROPERTY "Outer" \\* MERGEFORMAT ',
+            "separate",
+            "begin",
+            ' DOCPROPERTY "Inner" \\* MERGEFORMAT ',
+            "separate",
+            "inner",
+            "end",
+            "outer",
+            "end",
+        )
+        runs = list(w_p)
+        outer, inner = [ComplexField(node) for node in xpath(w_p, ".//w:instrText")]
+
+        assert outer.name == "Outer"
+        assert outer.get_separate_run() is runs[2]
+        assert outer.end_run is runs[9]
+        assert outer.get_runs_for_update() == runs[3:9]
+        assert inner.name == "Inner"
+        assert inner.begin_run is runs[3]
+        assert inner.get_separate_run() is runs[5]
+        assert inner.end_run is runs[7]
+
+        inner.replace_field_with_value()
+        outer.replace_field_with_value()
+        assert [run.text for run in w_p.iterchildren()] == ["inner", "outer"]
+
+    def test_scans_all_fields_of_paragraph_at_once(self):
+        w_p = field_paragraph(
+            *["begin", ' DOCPROPERTY "Foo" \\* MERGEFORMAT ', "separate", "v", "end"]
+            * 3
+        )
+        spans = scan_complex_fields(w_p)
+        nodes = xpath(w_p, ".//w:instrText")
+
+        assert len(set(spans[node] for node in nodes)) == 3
+        for node in nodes:
+            ComplexField(node, spans).update("bar")
+        assert [run.text for run in w_p.iterchildren()] == ["", "", "", "bar", ""] * 3
+
+    def test_update_of_field_without_separate_adds_value_once(self):
+        w_p = field_paragraph("begin", ' DOCPROPERTY "Foo" \\* MERGEFORMAT ', "end")
+        field = ComplexField(xpath(w_p, ".//w:instrText")[0])
+
+        field.update("foo")
+        field.update("bar")
+
+        assert [run.text for run in w_p.iterchildren()] == ["", "", "", "bar", ""]
+
+    def test_field_without_end_is_invalid(self):
+        w_p = field_paragraph("begin", ' DOCPROPERTY "Foo" \\* MERGEFORMAT ')
+
+        with pytest.raises(InvalidComplexField):
+            ComplexField(xpath(w_p, ".//w:instrText")[0])
+
 
 def test_get_doc_properties():
     document = Document(docx_path("docproperties.docx"))
@@ -797,6 +916,50 @@ def test_delete_doc_properties():
     assert xpath(props._element, ".//cp:property/@pid") == ["2", "3", "4"]
 
 
+def test_properties_with_missing_or_invalid_pid_are_ignored_for_next_pid():
+    document = Document(docx_path("docproperties.docx"))
+    part = document.part.package.part_related_by(RT.CUSTOM_PROPERTIES)
+    element = parse_xml(part.blob)
+    props = xpath(element, ".//cp:property")
+    del props[-1].attrib["pid"]
+    props[-2].set("pid", "foo")
+    part._blob = tostring(element)
+
+    props = CustomProperties(document)
+    assert props["Text Property"] == "Foo Bar"
+    props.add("My Text Property", "foo")
+
+    assert xpath(props._element, ".//cp:property/@pid")[-1] == "5"
+
+
+def test_add_doc_property_after_delete_uses_next_pid():
+    document = Document(docx_path("docproperties.docx"))
+    props = CustomProperties(document)
+
+    del props["Text Property"]
+    props.add("My Text Property", "foo")
+    props.add("My Other Property", "bar")
+
+    assert xpath(props._element, ".//cp:property/@pid") == [
+        "2",
+        "3",
+        "4",
+        "5",
+        "6",
+        "7",
+    ]
+
+
+def test_delete_doc_property_reveals_property_with_same_name():
+    document = Document(docx_path("docproperties.docx"))
+    props = CustomProperties(document)
+    props.add("text property", "other")
+
+    assert props["Text Property"] == "Foo Bar"
+    del props["Text Property"]
+    assert props["Text Property"] == "other"
+
+
 def test_delete_doc_property_is_case_insensitive():
     document = Document(docx_path("docproperties.docx"))
     props = CustomProperties(document)
@@ -849,6 +1012,55 @@ def test_set_doc_property_on_document_without_properties_creates_new_part():
     part = document.part.package.part_related_by(RT.CUSTOM_PROPERTIES)
     assert part is not None
 
+    props["Text Property"] = "Bar"
+    assert b"Bar" in part.blob
+
+
+def test_batch_serializes_properties_once(monkeypatch):
+    document = Document(docx_path("docproperties.docx"))
+    props = CustomProperties(document)
+    blob = props.part.blob
+    calls = []
+    update_part = props._update_part
+
+    def counting_update_part():
+        calls.append(props._batch_depth)
+        update_part()
+
+    monkeypatch.setattr(props, "_update_part", counting_update_part)
+
+    with props.batch():
+        props["Text Property"] = "baz"
+        props.add("My Property", "foo")
+        del props["Number Property"]
+        assert props.part.blob == blob
+
+    assert props.part.blob != blob
+    assert calls.count(0) == 1
+    assert props["Text Property"] == "baz"
+    assert CustomProperties(document)["My Property"] == "foo"
+    assert xpath(props._element, ".//cp:property/@pid") == [
+        "2",
+        "3",
+        "4",
+        "5",
+        "6",
+    ]
+
+
+def test_set_properties_adds_and_updates_properties():
+    document = Document(docx_path("master.docx"))
+    props = CustomProperties(document)
+    props.set_properties({"Text Property": "foo", "Number Property": 1})
+    props.set_properties({"text property": "bar", "Other Property": True})
+
+    props = CustomProperties(document)
+    assert props.items() == [
+        ("Text Property", "bar"),
+        ("Number Property", 1),
+        ("Other Property", True),
+    ]
+
 
 def test_doc_properties_keys():
     document = Document(docx_path("docproperties.docx"))
@@ -927,3 +1139,31 @@ def test_vt2value_returns_empty_string_for_missing_text_node():
     node = parse_xml(CUSTOM_PROPERTY_TYPES["text"])
     node.text = None
     assert vt2value(node) == ""
+
+
+def test_doc_language_is_determined_on_first_use(monkeypatch):
+    calls = []
+    get_doc_language = CustomProperties.get_doc_language
+
+    def counting_get_doc_language(self):
+        calls.append(self)
+        return get_doc_language(self)
+
+    monkeypatch.setattr(CustomProperties, "get_doc_language", counting_get_doc_language)
+    document = Document(docx_path("date_docproperties_with_format.docx"))
+    props = CustomProperties(document)
+    props["Text Property"] = "foo"
+    assert calls == []
+
+    assert props.language == "fr_CH"
+    assert props.language == "fr_CH"
+    assert len(calls) == 1
+
+
+def test_doc_language_can_be_set():
+    document = Document(docx_path("date_docproperties_with_format.docx"))
+    props = CustomProperties(document)
+    props.language = "de_CH"
+    props.update_all()
+
+    assert document.paragraphs[1].text == "Donnerstag 23 Januar 2020"
@@ -0,0 +1,51 @@
+from docx.oxml import parse_xml
+
+from docxcompose.references import ReferenceIndex
+
+
+XML = """
+<w:body
+    xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+    xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+    xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main"
+    xmlns:v="urn:schemas-microsoft-com:vml">
+  <w:p>
+    <w:pPr>
+      <w:pStyle w:val="Heading1"/>
+      <w:numPr><w:ilvl w:val="0"/><w:numId w:val="3"/></w:numPr>
+      <w:sectPr><w:headerReference r:id="rId7"/></w:sectPr>
+    </w:pPr>
+    <w:hyperlink r:id="rId5">
+      <w:r><w:rPr><w:rStyle w:val="Strong"/></w:rPr></w:r>
+    </w:hyperlink>
+    <w:r><w:footnoteReference w:id="1"/></w:r>
+    <w:r><a:blip r:embed="rId8"/></w:r>
+    <w:r><v:shape><v:imagedata r:id="rId9"/></v:shape></w:r>
+  </w:p>
+</w:body>
+"""
+
+
+def test_reference_index_collects_references_in_document_order():
+    refs = ReferenceIndex(parse_xml(XML))
+
+    assert [el.get("{%s}id" % el.nsmap["r"]) for el in refs.rid_elements] == [
+        "rId7",
+        "rId5",
+        "rId9",
+    ]
+    assert [el.val for el in refs.style_refs] == ["Heading1", "Strong"]
+    assert [el.val for el in refs.num_ids] == [3]
+    assert len(refs.footnote_refs) == 1
+    assert len(refs.blips) == 1
+    assert len(refs.shape_imagedata) == 1
+    assert len(refs.header_footer_refs) == 1
+
+
+def test_reference_index_helpers():
+    refs = ReferenceIndex(parse_xml(XML))
+
+    assert refs.paragraph_style_ids() == ["Heading1"]
+    assert refs.numbering_ids() == ["3"]
+    assert len(refs.paragraph_properties("Heading1")) == 1
+    assert refs.paragraph_properties("Strong") == []
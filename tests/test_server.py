@@ -1,3 +1,9 @@
+import asyncio
+import os
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 
 import pytest
@@ -7,7 +13,14 @@ from utils import ComparableDocument
 from utils import docx_path
 from utils import FixtureDocument
 
+from docxcompose import server
+from docxcompose.server import compose_pool_key
+from docxcompose.server import ComposePool
 from docxcompose.server import create_app
+from docxcompose.server import iterate_in_executor
+from docxcompose.server import job_store_key
+from docxcompose.server import template_cache_key
+from docxcompose.server import TemplateCache
 
 
 @pytest.fixture
@@ -79,3 +92,463 @@ async def test_healtcheck_returns_200(http_client):
     assert resp.status == 200
     text = await resp.text()
     assert text == "OK"
+
+
+async def test_post_returns_503_if_queue_is_full(aiohttp_client):
+    app = create_app(workers=1, max_queue=0)
+    client = await aiohttp_client(app)
+    files = {
+        "master": open(docx_path("master.docx"), "rb"),
+        "table": open(docx_path("table.docx"), "rb"),
+    }
+    with app[compose_pool_key].reserve():
+        resp = await client.post("/", data=files)
+    assert resp.status == 503
+    text = await resp.text()
+    assert text == "Server busy"
+
+
+def test_try_reserve_counts_request_only_if_pool_is_not_full():
+    pool = ComposePool(workers=1, max_queue=0)
+    with pool.try_reserve() as first:
+        with pool.try_reserve() as second:
+            assert first
+            assert not second
+            assert pool.pending == 1
+    assert pool.pending == 0
+    pool.shutdown()
+
+
+async def test_post_is_rejected_while_loading_template_of_other_request(
+    aiohttp_client, monkeypatch
+):
+    app = create_app(workers=1, max_queue=0)
+    client = await aiohttp_client(app)
+    loading = asyncio.Event()
+    loaded = asyncio.Event()
+    get_template = server.get_template
+
+    async def slow_get_template(app, template_hash):
+        loading.set()
+        await loaded.wait()
+        return await get_template(app, template_hash)
+
+    monkeypatch.setattr(server, "get_template", slow_get_template)
+    resp = await client.post(
+        "/templates", data={"master": open(docx_path("master.docx"), "rb")}
+    )
+    template_hash = (await resp.json())["template"]
+
+    files = {"table": open(docx_path("table.docx"), "rb")}
+    first = asyncio.ensure_future(
+        client.post(f"/?template={template_hash}", data=files)
+    )
+    await loading.wait()
+    files = {"table": open(docx_path("table.docx"), "rb")}
+    resp = await asyncio.wait_for(
+        client.post(f"/?template={template_hash}", data=files), 5
+    )
+    assert resp.status == 503
+
+    loaded.set()
+    resp = await first
+    assert resp.status == 200
+
+
+async def test_healthcheck_responds_while_composing(http_client, monkeypatch):
+    started = threading.Event()
+    finish = threading.Event()
+    compose_documents = server.compose_documents
+
+    def blocking_compose_documents(*args):
+        started.set()
+        finish.wait(5)
+        return compose_documents(*args)
+
+    monkeypatch.setattr(server, "compose_documents", blocking_compose_documents)
+
+    files = {
+        "master": open(docx_path("master.docx"), "rb"),
+        "table": open(docx_path("table.docx"), "rb"),
+    }
+    post = asyncio.ensure_future(http_client.post("/", data=files))
+    while not started.is_set():
+        await asyncio.sleep(0.01)
+
+    resp = await http_client.get("/healthcheck")
+    assert resp.status == 200
+
+    finish.set()
+    resp = await post
+    assert resp.status == 200
+
+
+async def test_compose_in_process_pool(aiohttp_client):
+    client = await aiohttp_client(create_app(executor="process", workers=1))
+    files = {
+        "master": open(docx_path("master.docx"), "rb"),
+        "table": open(docx_path("table.docx"), "rb"),
+    }
+    resp = await client.post("/", data=files)
+    assert resp.status == 200
+    composed_doc = ComparableDocument(Document(BytesIO(await resp.read())))
+    composed_fixture = FixtureDocument("table.docx")
+    assert composed_doc == composed_fixture
+
+
+async def test_compose_documents_larger_than_spool_size(aiohttp_client):
+    client = await aiohttp_client(create_app(spool_size=1024))
+    files = {
+        "master": open(docx_path("master.docx"), "rb"),
+        "table": open(docx_path("table.docx"), "rb"),
+    }
+    resp = await client.post("/", data=files)
+    assert resp.status == 200
+    composed_doc = ComparableDocument(Document(BytesIO(await resp.read())))
+    composed_fixture = FixtureDocument("table.docx")
+    assert composed_doc == composed_fixture
+
+
+async def test_chunks_are_not_produced_in_compose_pool(http_client, monkeypatch):
+    pool = http_client.app[compose_pool_key]
+    funcs = []
+    run = pool.run
+
+    async def recording_run(func, *args):
+        funcs.append(func)
+        return await run(func, *args)
+
+    monkeypatch.setattr(pool, "run", recording_run)
+    files = {
+        "master": open(docx_path("master.docx"), "rb"),
+        "table": open(docx_path("table.docx"), "rb"),
+    }
+    resp = await http_client.post("/", data=files)
+    assert resp.status == 200
+    await resp.read()
+    assert funcs == [server.compose_documents]
+
+
+@pytest.fixture
+def stream_executor():
+    executor = ThreadPoolExecutor(max_workers=1)
+    yield executor
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def test_streams_are_produced_in_a_bounded_pool(aiohttp_client):
+    client = await aiohttp_client(create_app(workers=2))
+    pool = client.app[compose_pool_key]
+    assert pool.streams is not pool.executor
+    assert pool.streams._max_workers == 2
+
+
+async def test_iterate_in_executor_yields_items_in_order(stream_executor):
+    threads = set()
+
+    def items():
+        for i in range(10):
+            threads.add(threading.get_ident())
+            yield i
+
+    assert [
+        item async for item in iterate_in_executor(items(), stream_executor, 2)
+    ] == list(range(10))
+    assert threading.get_ident() not in threads
+
+
+async def test_iterate_in_executor_raises_errors_of_iterator(stream_executor):
+    def items():
+        yield 1
+        raise ValueError("broken")
+
+    chunks = iterate_in_executor(items(), stream_executor)
+    assert await anext(chunks) == 1
+    with pytest.raises(ValueError, match="broken"):
+        await anext(chunks)
+
+
+async def test_iterate_in_executor_stops_producing_when_closed(stream_executor):
+    stopped = threading.Event()
+
+    def items():
+        try:
+            for i in range(100):
+                yield i
+        finally:
+            stopped.set()
+
+    chunks = iterate_in_executor(items(), stream_executor, 1)
+    assert await anext(chunks) == 0
+    await chunks.aclose()
+    assert await asyncio.get_running_loop().run_in_executor(None, stopped.wait, 5)
+
+
+async def test_post_template_returns_hash(http_client):
+    resp = await http_client.post(
+        "/templates", data={"master": open(docx_path("master.docx"), "rb")}
+    )
+    assert resp.status == 201
+    template_hash = (await resp.json())["template"]
+
+    resp = await http_client.get(f"/templates/{template_hash}")
+    assert resp.status == 200
+
+
+async def test_post_invalid_template_returns_400(http_client):
+    resp = await http_client.post("/templates", data={"master": BytesIO(b"FOO")})
+    assert resp.status == 400
+    text = await resp.text()
+    assert text == "Invalid template"
+
+
+async def test_post_with_template_returns_composed_document(http_client):
+    resp = await http_client.post(
+        "/templates", data={"master": open(docx_path("master.docx"), "rb")}
+    )
+    template_hash = (await resp.json())["template"]
+
+    files = {"table": open(docx_path("table.docx"), "rb")}
+    resp = await http_client.post(f"/?template={template_hash}", data=files)
+    assert resp.status == 200
+    composed_doc = ComparableDocument(Document(BytesIO(await resp.read())))
+    composed_fixture = FixtureDocument("table.docx")
+    assert composed_doc == composed_fixture
+
+
+async def test_post_with_unknown_template_returns_404(http_client):
+    files = {"table": open(docx_path("table.docx"), "rb")}
+    resp = await http_client.post("/?template=foo", data=files)
+    assert resp.status == 404
+    text = await resp.text()
+    assert text == "Unknown template"
+
+    resp = await http_client.get("/templates/foo")
+    assert resp.status == 404
+
+
+def test_template_cache_evicts_least_recently_used_templates():
+    cache = TemplateCache(max_size=10)
+    cache.add("first", "first template", 5)
+    cache.add("second", "second template", 5)
+    assert cache.get("first") == "first template"
+
+    cache.add("third", "third template", 5)
+    assert "first" in cache
+    assert "second" not in cache
+    assert "third" in cache
+    assert cache.size == 10
+
+
+async def test_compose_with_template_in_process_pool(aiohttp_client):
+    client = await aiohttp_client(create_app(executor="process", workers=1))
+    resp = await client.post(
+        "/templates", data={"master": open(docx_path("master.docx"), "rb")}
+    )
+    template_hash = (await resp.json())["template"]
+
+    files = {"table": open(docx_path("table.docx"), "rb")}
+    resp = await client.post(f"/?template={template_hash}", data=files)
+    assert resp.status == 200
+    composed_doc = ComparableDocument(Document(BytesIO(await resp.read())))
+    composed_fixture = FixtureDocument("table.docx")
+    assert composed_doc == composed_fixture
+
+
+async def test_templates_are_shared_through_templates_dir(aiohttp_client, tmp_path):
+    first = await aiohttp_client(create_app(templates_dir=str(tmp_path)))
+    second = await aiohttp_client(create_app(templates_dir=str(tmp_path)))
+    resp = await first.post(
+        "/templates", data={"master": open(docx_path("master.docx"), "rb")}
+    )
+    template_hash = (await resp.json())["template"]
+
+    resp = await second.get(f"/templates/{template_hash}")
+    assert resp.status == 200
+
+    files = {"table": open(docx_path("table.docx"), "rb")}
+    resp = await second.post(f"/?template={template_hash}", data=files)
+    assert resp.status == 200
+    composed_doc = ComparableDocument(Document(BytesIO(await resp.read())))
+    composed_fixture = FixtureDocument("table.docx")
+    assert composed_doc == composed_fixture
+    assert template_hash in second.app[template_cache_key]
+
+
+async def test_unknown_template_in_templates_dir_returns_404(aiohttp_client, tmp_path):
+    client = await aiohttp_client(create_app(templates_dir=str(tmp_path)))
+    files = {"table": open(docx_path("table.docx"), "rb")}
+    resp = await client.post("/?template=%s" % ("0" * 64), data=files)
+    assert resp.status == 404
+
+    resp = await client.get("/templates/..%2Fpasswd")
+    assert resp.status == 404
+
+
+def test_compose_documents_reports_progress_including_master():
+    reported = []
+    documents = [docx_path("master.docx"), docx_path("table.docx")]
+    server.compose_documents(documents, {}, progress=reported.append)
+    assert reported == [1, 2]
+
+    reported = []
+    template = server.load_template(open(docx_path("master.docx"), "rb").read())
+    server.compose_documents(documents, {}, template, progress=reported.append)
+    assert reported == [1, 2, 3]
+
+
+async def wait_for_job(client, job_id):
+    while True:
+        resp = await client.get(f"/jobs/{job_id}")
+        status = await resp.json()
+        if status["status"] != "pending":
+            return status
+        await asyncio.sleep(0.01)
+
+
+async def test_submit_job_and_download_result(http_client):
+    files = {
+        "master": open(docx_path("master.docx"), "rb"),
+        "table": open(docx_path("table.docx"), "rb"),
+    }
+    resp = await http_client.post("/jobs", data=files)
+    assert resp.status == 202
+    job = await resp.json()
+    assert resp.headers["Location"] == f"/jobs/{job['job']}"
+    assert job["total"] == 2
+
+    status = await wait_for_job(http_client, job["job"])
+    assert status == {"job": job["job"], "status": "done", "composed": 2, "total": 2}
+
+    resp = await http_client.get(f"/jobs/{job['job']}/result")
+    assert resp.status == 200
+    composed_doc = ComparableDocument(Document(BytesIO(await resp.read())))
+    composed_fixture = FixtureDocument("table.docx")
+    assert composed_doc == composed_fixture
+
+
+async def test_submit_job_returns_503_if_queue_is_full(aiohttp_client, tmp_path):
+    app = create_app(workers=1, max_queue=0, jobs_dir=str(tmp_path))
+    client = await aiohttp_client(app)
+    files = {"master": open(docx_path("master.docx"), "rb")}
+    with app[compose_pool_key].reserve():
+        resp = await client.post("/jobs", data=files)
+    assert resp.status == 503
+    assert os.listdir(tmp_path) == []
+
+
+async def test_job_is_pending_in_pool_until_composed(http_client, monkeypatch):
+    finish = threading.Event()
+    compose_documents_to_file = server.compose_documents_to_file
+
+    def blocking_compose_documents_to_file(*args):
+        finish.wait(5)
+        return compose_documents_to_file(*args)
+
+    monkeypatch.setattr(
+        server, "compose_documents_to_file", blocking_compose_documents_to_file
+    )
+    pool = http_client.app[compose_pool_key]
+    files = {"master": open(docx_path("master.docx"), "rb")}
+    resp = await http_client.post("/jobs", data=files)
+    assert resp.status == 202
+    assert pool.pending == 1
+
+    finish.set()
+    await wait_for_job(http_client, (await resp.json())["job"])
+    await http_client.app[job_store_key].wait()
+    assert pool.pending == 0
+
+
+async def test_job_result_returns_409_until_job_is_done(http_client, monkeypatch):
+    finish = threading.Event()
+    compose_documents = server.compose_documents
+
+    def blocking_compose_documents(*args):
+        finish.wait(5)
+        return compose_documents(*args)
+
+    monkeypatch.setattr(server, "compose_documents", blocking_compose_documents)
+
+    files = {
+        "master": open(docx_path("master.docx"), "rb"),
+        "table": open(docx_path("table.docx"), "rb"),
+    }
+    resp = await http_client.post("/jobs", data=files)
+    job = await resp.json()
+
+    resp = await http_client.get(f"/jobs/{job['job']}/result")
+    assert resp.status == 409
+    text = await resp.text()
+    assert text == "Job not finished"
+
+    finish.set()
+    status = await wait_for_job(http_client, job["job"])
+    assert status["status"] == "done"
+
+
+async def test_failed_job(http_client):
+    files = {
+        "master": BytesIO(b"FOO"),
+        "table": BytesIO(b"bar"),
+    }
+    resp = await http_client.post("/jobs", data=files)
+    job = await resp.json()
+
+    status = await wait_for_job(http_client, job["job"])
+    assert status["status"] == "failed"
+
+    resp = await http_client.get(f"/jobs/{job['job']}/result")
+    assert resp.status == 500
+
+
+async def test_job_expires_after_ttl(aiohttp_client, tmp_path):
+    client = await aiohttp_client(create_app(jobs_dir=str(tmp_path), job_ttl=0))
+    files = {
+        "master": open(docx_path("master.docx"), "rb"),
+        "table": open(docx_path("table.docx"), "rb"),
+    }
+    resp = await client.post("/jobs", data=files)
+    job = await resp.json()
+    assert (tmp_path / job["job"]).is_dir()
+    await client.app[server.job_store_key].wait()
+
+    resp = await client.get(f"/jobs/{job['job']}")
+    assert resp.status == 404
+    assert not (tmp_path / job["job"]).exists()
+
+
+def test_unfinished_job_expires_if_not_updated_within_ttl(tmp_path, monkeypatch):
+    store = server.JobStore(str(tmp_path), ttl=60)
+    now = time.time()
+    monkeypatch.setattr(server.time, "time", lambda: now - 61)
+    stale = store.create()
+    monkeypatch.setattr(server.time, "time", lambda: now)
+    current = store.create()
+
+    store.expire()
+    assert not os.path.exists(stale.directory)
+    assert os.path.exists(current.directory)
+    assert store.get(current.id).status == "pending"
+
+
+async def test_unknown_job_returns_404(http_client):
+    resp = await http_client.get("/jobs/foo")
+    assert resp.status == 404
+    resp = await http_client.get("/jobs/foo/result")
+    assert resp.status == 404
+
+
+async def test_worker_is_recycled_after_max_requests(aiohttp_client, monkeypatch):
+    signals = []
+    monkeypatch.setattr(server.os, "kill", lambda pid, sig: signals.append(sig))
+    client = await aiohttp_client(create_app(max_requests=2))
+
+    await client.get("/healthcheck")
+    await asyncio.sleep(0)
+    assert signals == []
+
+    await client.get("/healthcheck")
+    await client.get("/healthcheck")
+    await asyncio.sleep(0)
+    assert signals == [signal.SIGTERM]
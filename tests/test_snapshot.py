@@ -0,0 +1,42 @@
+from docx import Document
+from utils import ComparableDocument
+from utils import docx_path
+from utils import FixtureDocument
+
+from docxcompose.composer import Composer
+from docxcompose.snapshot import DocumentSnapshot
+
+
+def test_clone_equals_document():
+    doc = Document(docx_path("header_with_image.docx"))
+    snapshot = DocumentSnapshot(doc)
+
+    clone = snapshot.clone()
+    assert clone is not doc
+    assert clone.part.package is not doc.part.package
+    assert ComparableDocument(clone) == ComparableDocument(doc)
+    assert clone.part.package.rels.xml == doc.part.package.rels.xml
+    assert len(clone.part.package.image_parts) == len(doc.part.package.image_parts)
+
+
+def test_clones_are_independent():
+    doc = Document(docx_path("master.docx"))
+    snapshot = DocumentSnapshot(doc)
+    paragraphs = len(doc.paragraphs)
+
+    doc.add_paragraph("Changed original")
+    first = snapshot.clone()
+    first.add_paragraph("Changed clone")
+    second = snapshot.clone()
+
+    assert len(first.paragraphs) == paragraphs + 1
+    assert len(second.paragraphs) == paragraphs
+
+
+def test_compose_with_clone():
+    snapshot = DocumentSnapshot(Document(docx_path("master.docx")))
+
+    for _ in range(2):
+        composer = Composer(snapshot.clone())
+        composer.append(Document(docx_path("images.docx")))
+        assert ComparableDocument(composer.doc) == FixtureDocument("images.docx")
@@ -0,0 +1,38 @@
+from docx import Document
+from utils import docx_path
+
+from docxcompose.composer import Composer
+from docxcompose.stats import ComposerStats
+
+
+def test_stats_are_disabled_by_default():
+    composer = Composer(Document(docx_path("master.docx")))
+    composer.append(Document(docx_path("images.docx")))
+
+    assert composer.stats is None
+
+
+def test_stats_record_calls_and_time_of_stages(tmpdir):
+    stats = ComposerStats()
+    composer = Composer(Document(docx_path("master.docx")), stats=stats)
+    composer.append(Document(docx_path("images.docx")))
+    composer.append(Document(docx_path("images.docx")))
+    composer.save(tmpdir.join("composed.docx").strpath)
+
+    result = stats.as_dict()
+    assert result["insert"]["calls"] == 2
+    assert result["renumber_ids"]["calls"] == 2
+    assert result["save"]["calls"] == 1
+    assert result["add_styles"]["calls"] == result["add_images"]["calls"]
+    assert result["insert"]["seconds"] >= result["add_images"]["seconds"] > 0
+
+
+def test_stats_callback_is_called_for_each_stage():
+    calls = []
+    stats = ComposerStats(callback=lambda stage, duration: calls.append(stage))
+    composer = Composer(Document(docx_path("master.docx")), stats=stats)
+    composer.append(Document(docx_path("images.docx")))
+
+    assert calls[-1] == "insert"
+    assert calls.count("insert") == 1
+    assert len(calls) == sum(stats.calls.values())
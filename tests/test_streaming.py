@@ -0,0 +1,32 @@
+from io import BytesIO
+from zipfile import ZipFile
+
+from docx import Document
+from utils import ComparableDocument
+from utils import docx_path
+
+from docxcompose.composer import Composer
+
+
+def test_stream_yields_composed_document_in_chunks():
+    composer = Composer(Document(docx_path("master.docx")))
+    composer.append(Document(docx_path("images.docx")))
+
+    chunks = list(composer.stream(chunk_size=4096))
+    assert len(chunks) > 1
+
+    data = b"".join(chunks)
+    assert ZipFile(BytesIO(data)).testzip() is None
+    streamed = ComparableDocument(Document(BytesIO(data)))
+    assert streamed == ComparableDocument(composer.doc)
+
+
+def test_stream_contains_same_zip_entries_as_save():
+    composer = Composer(Document(docx_path("master.docx")))
+    composer.append(Document(docx_path("images.docx")))
+
+    saved = BytesIO()
+    composer.save(saved)
+    streamed = BytesIO(b"".join(composer.stream()))
+
+    assert ZipFile(streamed).namelist() == ZipFile(saved).namelist()
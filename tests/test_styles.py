@@ -1,11 +1,15 @@
+from copy import deepcopy
+
 import pytest
 from docx import Document
+from docx.enum.style import WD_STYLE_TYPE
 from utils import ComparableDocument
 from utils import ComposedDocument
 from utils import docx_path
 from utils import FixtureDocument
 
 from docxcompose.composer import Composer
+from docxcompose.styles import StyleRegistry
 
 
 def test_contains_predefined_styles_in_masters_language(merged_styles):
@@ -111,6 +115,51 @@ def test_retain_formatting_from_default_styles():
     assert composed == expected
 
 
+def test_style_registry_maps_ids_and_ui_names():
+    doc = Document(docx_path("styles_en.docx"))
+    styles = StyleRegistry(doc.styles.element)
+
+    assert styles.ids == {s.style_id for s in doc.styles}
+    assert styles.id2name["Heading1"] == "Heading 1"
+    assert styles.name2id["Heading 1"] == "Heading1"
+    assert styles.get_by_id("Heading1") is doc.styles.element.get_by_id("Heading1")
+    assert styles.get_by_id("Missing") is None
+
+
+def test_style_registry_is_updated_when_appending_styles():
+    doc = Document(docx_path("styles_en.docx"))
+    styles = StyleRegistry(doc.styles.element)
+    style = deepcopy(styles.get_by_id("Heading1"))
+    style.styleId = "MyHeading"
+    style.name_val = "My Heading"
+
+    styles.append(style)
+
+    assert "MyHeading" in styles.ids
+    assert styles.name2id["My Heading"] == "MyHeading"
+    assert styles.get_by_id("MyHeading") is style
+    assert not styles.is_outdated(doc.styles.element)
+
+
+def test_style_registry_is_outdated_when_styles_are_added_without_it():
+    doc = Document(docx_path("styles_en.docx"))
+    styles = StyleRegistry(doc.styles.element)
+
+    doc.styles.add_style("My Style", WD_STYLE_TYPE.PARAGRAPH)
+
+    assert styles.is_outdated(doc.styles.element)
+
+
+def test_styles_added_between_inserts_are_registered():
+    composer = Composer(Document(docx_path("styles_en.docx")))
+    composer.append(Document(docx_path("styles_de.docx")))
+    composer.doc.styles.add_style("Added Style", WD_STYLE_TYPE.PARAGRAPH)
+
+    composer.append(Document(docx_path("styles_de.docx")))
+
+    assert composer.styles.name2id["Added Style"] == "AddedStyle"
+
+
 @pytest.fixture
 def merged_styles():
     composer = Composer(Document(docx_path("styles_en.docx")))